@@ -0,0 +1,164 @@
+"""Mixer ownership for the game: decoded-sample cache, music crossfades, SFX pool.
+
+Every track and effect is decoded from MP3 once and the raw mixer-format
+samples are written to AUDIO_CACHE_DIR, so later runs build their Sounds
+straight from PCM. Cache files are keyed on the mixer format, and ones for
+any other format or CACHE_VERSION are deleted when the mixer opens. Loading happens on one background thread in the order the
+game needs things; the game thread only starts, fades and stops channels,
+which never waits on a decoder.
+
+Music plays on two reserved channels so a track change is a crossfade rather
+than mixer.music's stop/load/play. Sound effects rotate through a fixed pool
+of channels; when every one is busy the oldest effect is cut off.
+"""
+import os
+import queue
+import threading
+import time
+
+import pygame
+
+AUDIO_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'hungry_snake', 'audio')
+CACHE_VERSION = 1 # Bump when what goes into a cache file changes; older files are pruned
+MUSIC_CHANNELS = 2 # Current track and the one fading in
+SFX_CHANNELS = 8
+CROSSFADE_MS = 800
+STOP_FADE_MS = 300
+
+class AudioManager:
+    """Owns the mixer once `start()` has opened it on the loader thread.
+
+    Everything is a no-op until the mixer is up or if it never comes up, so
+    callers don't check. `play_music` for a track that is still loading is
+    remembered and starts as soon as the loader reaches it.
+    """
+
+    def __init__(self, preload=(), cache_dir=AUDIO_CACHE_DIR, timings=None):
+        self.cache_dir = cache_dir
+        self.timings = timings if timings is not None else {} # label -> seconds, for startup reports
+        self.sounds = {} # file -> Sound
+        self.ready = threading.Event() # Mixer initialised (or failed)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._failed = set()
+        self._music_channels, self._music_index, self._music_file = [], 0, None
+        self._wanted_music = None
+        self._sfx_channels, self._sfx_next = [], 0
+        for music_file in preload: self._queue.put(music_file)
+
+    def start(self):
+        threading.Thread(target=self._loader, name="audio-loader", daemon=True).start()
+
+    # --- Loader thread ---
+    def _loader(self):
+        start = time.perf_counter()
+        try:
+            pygame.mixer.init()
+            pygame.mixer.set_num_channels(MUSIC_CHANNELS + SFX_CHANNELS)
+            pygame.mixer.set_reserved(MUSIC_CHANNELS) # Sound.play() elsewhere can't grab a music channel
+            self._music_channels = [pygame.mixer.Channel(i) for i in range(MUSIC_CHANNELS)]
+            self._sfx_channels = [pygame.mixer.Channel(i) for i in range(MUSIC_CHANNELS, MUSIC_CHANNELS + SFX_CHANNELS)]
+        except pygame.error as e:
+            print(f"Audio unavailable: {e}")
+        self.timings['audio: mixer init'] = time.perf_counter() - start
+        self.ready.set()
+        if not pygame.mixer.get_init(): return
+        self._prune_cache()
+        while True:
+            sound_file = self._queue.get()
+            if sound_file in self.sounds or sound_file in self._failed: continue
+            sound = self._load(sound_file)
+            with self._lock:
+                if sound is None: self._failed.add(sound_file)
+                else: self.sounds[sound_file] = sound
+                wanted = self._wanted_music
+            if wanted == sound_file:
+                if sound is not None: self._crossfade(sound_file)
+                elif sound_file != "bgm.mp3": # If boss music failed, try default
+                    print(f"Error loading music {sound_file}, falling back to bgm.mp3")
+                    self.play_music("bgm.mp3")
+
+    def _cache_suffix(self):
+        frequency, size, channels = pygame.mixer.get_init()
+        return f"-{frequency}-{size}-{channels}-v{CACHE_VERSION}.pcm"
+
+    def _cache_path(self, sound_file):
+        st = os.stat(sound_file)
+        return os.path.join(self.cache_dir, f"{os.path.basename(sound_file)}-{st.st_size}-{int(st.st_mtime)}{self._cache_suffix()}")
+
+    def _prune_cache(self):
+        # Samples for another mixer format or cache version would never be read again
+        suffix = self._cache_suffix()
+        try:
+            stale = [entry for entry in os.listdir(self.cache_dir) if not entry.endswith(suffix)]
+        except OSError:
+            return # No cache yet
+        for entry in stale:
+            try:
+                os.remove(os.path.join(self.cache_dir, entry))
+            except OSError as e:
+                print(f"Could not prune audio cache {entry}: {e}")
+
+    def _load(self, sound_file):
+        """Sound for a file: raw samples from the disk cache, else decode once and fill the cache."""
+        start = time.perf_counter()
+        try:
+            cache_path = self._cache_path(sound_file)
+        except OSError as e:
+            print(f"Could not load {sound_file}: {e}"); return None
+        try:
+            with open(cache_path, 'rb') as f: sound, how = pygame.mixer.Sound(buffer=f.read()), 'cached'
+        except OSError:
+            try:
+                sound, how = pygame.mixer.Sound(sound_file), 'decoded'
+            except pygame.error as e:
+                print(f"Could not load {sound_file}: {e}"); return None
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(cache_path + '.tmp', 'wb') as f: f.write(sound.get_raw())
+                os.replace(cache_path + '.tmp', cache_path)
+            except OSError as e:
+                print(f"Could not write audio cache {cache_path}: {e}")
+        self.timings[f'audio: {sound_file} ({how})'] = time.perf_counter() - start
+        return sound
+
+    def preload(self, *sound_files):
+        for sound_file in sound_files: self._queue.put(sound_file)
+
+    # --- Game thread ---
+    def play_sound(self, name):
+        """Fire an effect on the next free pooled channel, cutting off the oldest if all are busy."""
+        sound = self.sounds.get(f"{name}.mp3")
+        if sound is None or not self._sfx_channels: return
+        channels, count = self._sfx_channels, len(self._sfx_channels)
+        for i in range(count):
+            index = (self._sfx_next + i) % count
+            if not channels[index].get_busy(): break
+        else:
+            index = self._sfx_next
+        channels[index].play(sound)
+        self._sfx_next = (index + 1) % count
+
+    def play_music(self, music_file):
+        """Crossfade to a looping track, or start it once the loader has it."""
+        with self._lock:
+            self._wanted_music = music_file
+            loaded, failed = music_file in self.sounds, music_file in self._failed
+        if loaded: self._crossfade(music_file)
+        elif failed and music_file != "bgm.mp3": self.play_music("bgm.mp3")
+        elif not failed: self.preload(music_file)
+
+    def _crossfade(self, music_file):
+        with self._lock:
+            if music_file != self._wanted_music or not self._music_channels: return
+            current = self._music_channels[self._music_index]
+            if music_file == self._music_file and current.get_busy(): return
+            self._music_index = (self._music_index + 1) % len(self._music_channels)
+            current.fadeout(CROSSFADE_MS)
+            self._music_channels[self._music_index].play(self.sounds[music_file], loops=-1, fade_ms=CROSSFADE_MS)
+            self._music_file = music_file
+
+    def stop_music(self, fade_ms=STOP_FADE_MS):
+        with self._lock:
+            self._wanted_music, self._music_file = None, None
+            for channel in self._music_channels: channel.fadeout(fade_ms)
@@ -0,0 +1,154 @@
+"""Monte Carlo balance runner: many seeded bot games across all cores.
+
+    python balance.py --games 2000 --policy greedy
+    python balance.py --games 5000 --sweep enemy_base_speed=0.9,1.1,1.3 --sweep boss_trigger_score=10,50
+    python balance.py --policy mybots:cautious --out sweep.json
+
+Every configuration in the sweep (the cartesian product of --sweep values)
+plays the same seeds, so differences between rows come from the parameters
+rather than luck. Games are handed to a process pool in chunks and the
+aggregates are printed as chunks finish.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bots import load_policy
+from sim import GameSim, game_speed
+
+# CLI names for the balance constants -> GameSim tuning attributes
+TUNABLES = {
+    'boss_trigger_score': 'boss_trigger_score', 'BOSS_TRIGGER_SCORE': 'boss_trigger_score',
+    'boss_max_health': 'boss_max_health', 'BOSS_MAX_HEALTH_HITS': 'boss_max_health',
+    'enemy_base_speed': 'enemy_base_speed',
+    'boss_base_speed': 'boss_base_speed', 'BOSS_BASE_SPEED_NORMAL': 'boss_base_speed',
+    'bomb_spawn_interval': 'bomb_spawn_interval',
+    'dart_cooldown': 'dart_cooldown', 'DART_COOLDOWN_TIME': 'dart_cooldown',
+}
+DEFAULT_MAX_MINUTES = 10
+
+def play_game(policy_factory, seed, tuning, max_ticks, flow_field=True):
+    sim = GameSim(seed, tuning=tuning, flow_field=flow_field)
+    policy = policy_factory(random.Random(seed))
+    while sim.is_active and sim.tick_count < max_ticks: sim.tick(policy(sim))
+    return {
+        'seed': seed, 'survival': sim.time, 'score': sim.score, 'state': sim.game_state,
+        'cause': sim.death_cause or ('victory' if sim.game_state == "VICTORY" else 'timeout'),
+        'boss_time': sim.boss_fight_start_time,
+    }
+
+def run_chunk(config_index, policy_spec, tuning, seeds, max_ticks, flow_field=True):
+    """Worker entry point: play a run of seeds for one configuration."""
+    policy_factory = load_policy(policy_spec)
+    return config_index, [play_game(policy_factory, seed, tuning, max_ticks, flow_field) for seed in seeds]
+
+class Aggregate:
+    """Running statistics for one configuration."""
+
+    def __init__(self, tuning):
+        self.tuning = tuning
+        self.survival, self.scores, self.boss_times = [], [], []
+        self.causes = Counter()
+        self.victories = 0
+
+    def add(self, result):
+        self.survival.append(result['survival']); self.scores.append(result['score'])
+        self.causes[result['cause']] += 1
+        if result['boss_time'] is not None: self.boss_times.append(result['boss_time'])
+        if result['state'] == "VICTORY": self.victories += 1
+
+    @property
+    def games(self):
+        return len(self.scores)
+
+    def summary(self):
+        def quantiles(values):
+            if not values: return None
+            ordered = sorted(values)
+            pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+            return {'mean': statistics.fmean(ordered), 'p10': pick(0.1), 'p50': pick(0.5), 'p90': pick(0.9), 'max': ordered[-1]}
+        reached = len(self.boss_times)
+        return {
+            'tuning': self.tuning, 'games': self.games,
+            'survival_s': quantiles(self.survival), 'score': quantiles(self.scores),
+            'boss_reached_rate': reached / self.games if self.games else 0.0,
+            'time_to_boss_s': quantiles(self.boss_times),
+            'boss_kill_rate': self.victories / self.games if self.games else 0.0,
+            'boss_kill_rate_when_reached': self.victories / reached if reached else 0.0,
+            'outcomes': dict(self.causes),
+        }
+
+def parse_sweeps(sweeps):
+    """['enemy_base_speed=0.9,1.1'] -> list of tuning dicts (cartesian product)."""
+    axes = []
+    for sweep in sweeps or []:
+        name, _, values = sweep.partition('=')
+        if name not in TUNABLES or not values: raise SystemExit(f"bad --sweep {sweep!r}; tunables: {', '.join(sorted(set(TUNABLES.values())))}")
+        axes.append([(TUNABLES[name], float(v) if '.' in v else int(v)) for v in values.split(',')])
+    return [dict(combo) for combo in itertools.product(*axes)] if axes else [{}]
+
+def format_row(summary):
+    def mean(stat): return f"{stat['mean']:.1f}" if stat else "-"
+    def p50(stat): return f"{stat['p50']:.0f}" if stat else "-"
+    outcomes = ' '.join(f"{cause}:{count}" for cause, count in sorted(summary['outcomes'].items()))
+    tuning = ' '.join(f"{k}={v}" for k, v in summary['tuning'].items()) or 'defaults'
+    return (f"{tuning:<40} {summary['games']:>7} {mean(summary['survival_s']):>8} {mean(summary['score']):>7} {p50(summary['score']):>5} "
+            f"{summary['boss_reached_rate'] * 100:>6.1f}% {mean(summary['time_to_boss_s']):>7} {summary['boss_kill_rate'] * 100:>6.1f}%  {outcomes}")
+
+HEADER = f"{'config':<40} {'games':>7} {'surv s':>8} {'score':>7} {'p50':>5} {'boss%':>7} {'t boss':>7} {'kill%':>7}  outcomes"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run seeded bot games in parallel and aggregate balance statistics")
+    parser.add_argument('--games', type=int, default=1000, help="games per configuration")
+    parser.add_argument('--policy', default='greedy', help="bot name from bots.POLICIES or module:attribute")
+    parser.add_argument('--sweep', action='append', metavar='NAME=V1,V2', help="repeatable; cartesian product of values")
+    parser.add_argument('--seed', type=int, default=0, help="first seed; games use seed .. seed+games-1")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk', type=int, default=20, help="games per task sent to a worker")
+    parser.add_argument('--max-minutes', type=float, default=DEFAULT_MAX_MINUTES, help="cap on simulated time per game")
+    parser.add_argument('--no-flow-field', '--direct-chase', dest='flow_field', action='store_false',
+                        help="enemies head straight for the snake instead of pathing around bombs as in the game")
+    parser.add_argument('--out', help="write the final summaries as JSON")
+    args = parser.parse_args(argv)
+
+    load_policy(args.policy) # Fail fast on a bad name
+    configs = parse_sweeps(args.sweep)
+    max_ticks = int(args.max_minutes * 60 * game_speed)
+    aggregates = [Aggregate(tuning) for tuning in configs]
+    seeds = list(range(args.seed, args.seed + args.games))
+    chunks = [seeds[i:i + args.chunk] for i in range(0, len(seeds), args.chunk)]
+    total = len(configs) * args.games
+
+    start = last_report = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_chunk, index, args.policy, tuning, chunk, max_ticks, args.flow_field)
+                   for chunk in chunks for index, tuning in enumerate(configs)]
+        done = 0
+        for future in as_completed(futures):
+            index, results = future.result()
+            for result in results: aggregates[index].add(result)
+            done += len(results)
+            now = time.perf_counter()
+            if now - last_report > 2 or done == total:
+                last_report = now
+                print(f"\n{done}/{total} games, {done / (now - start):.0f} games/s on {args.workers} workers")
+                print(HEADER)
+                for aggregate in aggregates:
+                    if aggregate.games: print(format_row(aggregate.summary()))
+                sys.stdout.flush()
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'policy': args.policy, 'games': args.games, 'seed': args.seed, 'max_minutes': args.max_minutes, 'flow_field': args.flow_field,
+                       'configs': [aggregate.summary() for aggregate in aggregates]}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+if __name__ == '__main__':
+    main()
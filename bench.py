@@ -0,0 +1,174 @@
+"""Deterministic benchmark scenarios for the simulation and renderer.
+
+    python bench.py                      # all scenarios, headless and dummy-video
+    python bench.py -s boss_fight -t 5000
+    python bench.py --out new.json --compare old.json
+
+Every scenario (see scenarios.py) is a seed, a setup hook and a scripted
+input policy, so two runs on the same commit simulate exactly the same ticks.
+Results go to a JSON file that --compare diffs against an earlier run.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import swarm
+from scenarios import SCENARIOS
+from sim import GameSim
+
+DEFAULT_TICKS = 2000
+ALLOC_TICKS = 300 # tracemalloc is slow, so memory growth is measured on a shorter pass
+
+def percentile(sorted_values, fraction):
+    if not sorted_values: return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+class ScenarioRun:
+    """Drives one scenario, restarting with the next seed whenever a game ends."""
+
+    def __init__(self, name, seed, render):
+        self.setup, self.policy, self.sim_options = SCENARIOS[name]
+        self.seed, self.render, self.restarts = seed, render, 0
+        self.turn_latencies, self.turns_dropped = [], 0
+        self.rage_ticks = 0
+        self.sim = self._new_sim()
+
+    def _new_sim(self):
+        sim = GameSim(self.seed + self.restarts, **self.sim_options)
+        self.setup(sim); sim.warm_up()
+        return sim
+
+    def restart(self):
+        self.turns_dropped += self.sim.turns_dropped
+        self.restarts += 1; self.sim = self._new_sim()
+
+    def frame(self):
+        if not self.sim.is_active: self.restart()
+        sim = self.sim
+        turns_applied = sim.turns_applied
+        sim.tick(self.policy(sim, sim.tick_count))
+        if sim.turns_applied != turns_applied: self.turn_latencies.append(sim.turn_latencies[-1]) # At most one move per tick
+        self.rage_ticks += sim.boss_rage_mode_active
+        if self.render:
+            import game
+            game.screen.fill(game.BLACK)
+            game.draw_sim(self.sim)
+            game.pygame.display.update()
+
+# Scenarios that only measure what they are named for if the run gets there:
+# name -> (result key that must be non-zero, in runs of at least this many ticks, what went wrong)
+REQUIRED = {'boss_fight': ('boss_rage_ticks', 1000, "the boss never reached rage mode")}
+
+def run_scenario(name, ticks, seed, render):
+    run = ScenarioRun(name, seed, render)
+    frame_ns, setup_ns = [], []
+    gc.collect()
+    collections_before = sum(stat['collections'] for stat in gc.get_stats())
+    for tick in range(ticks):
+        if not run.sim.is_active:
+            # Building the next game is reported on its own; in a big world it would swamp the frame figures
+            t0 = time.perf_counter_ns()
+            run.restart()
+            setup_ns.append(time.perf_counter_ns() - t0)
+        t0 = time.perf_counter_ns()
+        run.frame()
+        frame_ns.append(time.perf_counter_ns() - t0)
+    elapsed = sum(frame_ns) / 1e9
+    restarts = run.restarts
+    turn_ms = sorted(seconds * 1000 for seconds in run.turn_latencies)
+    turns_dropped = run.turns_dropped + run.sim.turns_dropped
+    rage_ticks = run.rage_ticks
+    gc_collections = sum(stat['collections'] for stat in gc.get_stats()) - collections_before
+
+    # Same scenario again from the start under tracemalloc. The figures are net growth between a snapshot before
+    # and after the pass: blocks and bytes still held at the end, per tick. Temporaries a tick allocates and frees
+    # again don't show up, so this catches leaks and caches that keep growing, not allocation churn.
+    run = ScenarioRun(name, seed, render)
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    for tick in range(min(ticks, ALLOC_TICKS)): run.frame()
+    stats = tracemalloc.take_snapshot().compare_to(snapshot_before, 'filename')
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    alloc_ticks = min(ticks, ALLOC_TICKS)
+
+    frame_ms = sorted(ns / 1e6 for ns in frame_ns)
+    result = {
+        'scenario': name, 'mode': 'render' if render else 'headless', 'ticks': ticks, 'seed': seed,
+        'restarts': restarts, 'setup_ms_mean': sum(setup_ns) / len(setup_ns) / 1e6 if setup_ns else 0.0,
+        'setup_ms_max': max(setup_ns, default=0) / 1e6,
+        'ticks_per_sec': ticks / elapsed if elapsed else 0.0,
+        'frame_ms_p50': percentile(frame_ms, 0.50), 'frame_ms_p99': percentile(frame_ms, 0.99),
+        'frame_ms_max': frame_ms[-1] if frame_ms else 0.0,
+        'gc_collections': gc_collections,
+        'turns_applied': len(turn_ms), 'turns_dropped': turns_dropped,
+        'turn_latency_ms_p50': percentile(turn_ms, 0.50), 'turn_latency_ms_p99': percentile(turn_ms, 0.99),
+        'retained_blocks_per_tick': sum(max(0, s.count_diff) for s in stats) / alloc_ticks,
+        'retained_bytes_per_tick': sum(max(0, s.size_diff) for s in stats) / alloc_ticks,
+        'alloc_peak_bytes': peak, 'boss_rage_ticks': rage_ticks,
+    }
+    key, min_ticks, problem = REQUIRED.get(name, (None, 0, None))
+    if key and ticks >= min_ticks and not result[key]: raise AssertionError(f"{name}: {problem} in {ticks} ticks from seed {seed}")
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f: baseline = json.load(f)
+    old = {(r['scenario'], r['mode']): r for r in baseline['results']}
+    print(f"\nvs {baseline_path} ({baseline.get('commit')}):")
+    for r in results:
+        before = old.get((r['scenario'], r['mode']))
+        if not before: continue
+        tps = (r['ticks_per_sec'] / before['ticks_per_sec'] - 1) * 100 if before['ticks_per_sec'] else 0.0
+        p99 = (r['frame_ms_p99'] / before['frame_ms_p99'] - 1) * 100 if before['frame_ms_p99'] else 0.0
+        print(f"  {r['scenario']:<22} {r['mode']:<8} ticks/s {tps:+7.1f}%   p99 {p99:+7.1f}%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the scripted benchmark scenarios")
+    parser.add_argument('-s', '--scenario', action='append', choices=sorted(SCENARIOS), help="repeatable; default all")
+    parser.add_argument('-t', '--ticks', type=int, default=DEFAULT_TICKS)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mode', choices=('headless', 'render', 'both'), default='both')
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--compare', metavar='JSON', help="earlier results file to diff against")
+    args = parser.parse_args(argv)
+
+    names = args.scenario or list(SCENARIOS)
+    if swarm.np is None: # Swarm scenarios need NumPy
+        names = [n for n in names if not SCENARIOS[n][2].get('swarm')]
+    modes = [False, True] if args.mode == 'both' else [args.mode == 'render']
+    if True in modes:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy'); os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        import game
+        game.init_game()
+
+    results = []
+    print(f"{'scenario':<22} {'mode':<8} {'ticks/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'retained/tick':>14} {'restarts':>8} {'setup ms':>9} "
+          f"{'turn p50':>9} {'turn p99':>9} {'dropped':>8}")
+    for name in names:
+        for render in modes:
+            r = run_scenario(name, args.ticks, args.seed, render)
+            results.append(r)
+            print(f"{name:<22} {r['mode']:<8} {r['ticks_per_sec']:>10.0f} {r['frame_ms_p50']:>8.3f} {r['frame_ms_p99']:>8.3f} "
+                  f"{r['retained_blocks_per_tick']:>14.1f} {r['restarts']:>8} {r['setup_ms_mean']:>9.1f} {r['turn_latency_ms_p50']:>9.1f} "
+                  f"{r['turn_latency_ms_p99']:>9.1f} {r['turns_dropped']:>8}")
+
+    report = {'commit': git_commit(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+              'platform': platform.platform(), 'ticks': args.ticks, 'seed': args.seed, 'results': results}
+    with open(args.out, 'w') as f: json.dump(report, f, indent=2)
+    print(f"\nWrote {args.out}")
+    if args.compare: compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
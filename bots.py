@@ -0,0 +1,91 @@
+"""Scripted player policies for headless runs.
+
+A policy factory takes a random.Random and returns a callable
+`policy(sim) -> Inputs` that is asked for input once per tick. Factories are
+looked up by name in POLICIES, or given as "module:attribute" so balance runs
+can plug in bots that live elsewhere.
+"""
+import importlib
+import math
+
+from sim import Inputs, DIRECTIONS, snake_block, game_border_thickness
+
+def _enemies_near(sim, rect):
+    if sim.swarm is not None: return int(sim.swarm.overlapping(rect).sum())
+    return sum(1 for e in sim.grid.query(rect, 'enemy') if rect.colliderect(e['rect']))
+
+def _danger(sim, rect):
+    """How bad it would be for the snake to occupy `rect`."""
+    if not (game_border_thickness <= rect.left and rect.right <= sim.world_w - game_border_thickness and
+            game_border_thickness <= rect.top and rect.bottom <= sim.world_h - game_border_thickness):
+        return math.inf
+    # Anything hostile within a block of the new position
+    near = rect.inflate(snake_block * 2, snake_block * 2)
+    danger = 0
+    for bomb_r in sim.grid.query(rect, 'bomb'):
+        if rect.colliderect(bomb_r): return math.inf
+    danger += 1000 * _enemies_near(sim, near)
+    if sim.boss_rect and near.colliderect(sim.boss_rect): danger += 5000
+    return danger
+
+def _aligned(sim, target_rect, direction=None):
+    """True if a dart fired along `direction` (default: facing) would head at target_rect."""
+    dx, dy = DIRECTIONS[direction or sim.snake_facing_direction_str]
+    snake = sim.snake_rect
+    if dx: return abs(target_rect.centery - snake.centery) < snake_block and (target_rect.centerx - snake.centerx) * dx > 0
+    return abs(target_rect.centerx - snake.centerx) < snake_block and (target_rect.centery - snake.centery) * dy > 0
+
+def random_walk(rng):
+    """Turns at random, steering away from walls."""
+    def policy(sim):
+        direction = rng.choice(list(DIRECTIONS)) if rng.random() < 0.05 else None
+        if sim.x < 100: direction = 'RIGHT'
+        elif sim.x > sim.world_w - 120: direction = 'LEFT'
+        elif sim.y < 100: direction = 'DOWN'
+        elif sim.y > sim.world_h - 120: direction = 'UP'
+        return Inputs(direction, rng.random() < 0.1, rng.random() < 0.005)
+    return policy
+
+def greedy(rng):
+    """Heads for the nearest pickup and kites the boss, dodging what is one step away."""
+    def policy(sim):
+        snake, boss, view = sim.snake_rect, sim.boss_rect, sim.camera_rect()
+        if boss:
+            # Circle the arena away from the boss, taking shots as it lines up
+            target = (view.left + view.right - boss.centerx, view.top + view.bottom - boss.centery)
+        else:
+            pickups = [r for r in (sim.blue_item_rect, sim.apple_rect) if r]
+            target = min((r.center for r in pickups), key=lambda c: abs(c[0] - snake.centerx) + abs(c[1] - snake.centery),
+                         default=view.center)
+        best, best_cost = None, math.inf
+        for direction, (dx, dy) in DIRECTIONS.items():
+            if not sim.can_turn(direction): continue
+            step = snake.move(dx * snake_block, dy * snake_block)
+            cost = _danger(sim, step) + abs(target[0] - step.centerx) + abs(target[1] - step.centery) + rng.random()
+            if boss: cost += 40000 / max(1.0, math.dist(boss.center, step.center))
+            if cost < best_cost: best, best_cost = direction, cost
+
+        fire = False
+        if sim.dart_ready and boss:
+            # Snap round to face the boss for one shot; darts leave along the new facing
+            shot = next((d for d in DIRECTIONS if sim.can_turn(d) and _aligned(sim, boss, d)), None)
+            if shot and _danger(sim, snake.move(DIRECTIONS[shot][0] * snake_block, DIRECTIONS[shot][1] * snake_block)) < math.inf:
+                best, fire = shot, True
+        elif sim.dart_ready:
+            if sim.swarm is not None: fire = True # Hordes are everywhere
+            else: fire = any(_aligned(sim, e['rect']) for e in sim.enemies)
+        shockwave = False
+        if sim.shockwave_charges and not sim.shockwave_active:
+            if boss: shockwave = math.dist(boss.center, snake.center) < 150
+            else: shockwave = _enemies_near(sim, snake.inflate(snake_block * 4, snake_block * 4)) > 0
+        return Inputs(best, fire, shockwave)
+    return policy
+
+POLICIES = {'random': random_walk, 'greedy': greedy}
+
+def load_policy(spec):
+    """Policy factory from a registered name or a "module:attribute" path."""
+    if spec in POLICIES: return POLICIES[spec]
+    if ':' not in spec: raise ValueError(f"unknown policy {spec!r}; use one of {sorted(POLICIES)} or module:attribute")
+    module_name, attribute = spec.split(':', 1)
+    return getattr(importlib.import_module(module_name), attribute)
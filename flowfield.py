@@ -0,0 +1,212 @@
+"""Flow-field steering shared by every chaser.
+
+One breadth-first search from the target cell gives every reachable cell its
+step count; a chaser in any cell then only needs that cell's best neighbour.
+The search is redone when the target changes cell or an obstacle appears or
+goes, never per chaser, so a thousand enemies cost the same search as one.
+"""
+try:
+    import numpy as np
+except ImportError: # Only the vectorised swarm lookup needs it
+    np = None
+
+# Orthogonal first so equally good steps prefer them when the target is dead ahead
+STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+_UNSET = object()
+
+def _sign(value):
+    return (value > 0) - (value < 0)
+
+class FlowField:
+    """Distances to a target over a grid of cells with blocked cells.
+
+    Cells are flat ids `row * cols + col`. Only cells inside `bounds`
+    (col0, row0, col1, row1, inclusive) and not blocked can be walked through,
+    and diagonal steps may not cut the corner of an unwalkable cell. With
+    `max_distance` the search stops that many steps out, which bounds its
+    cost in big worlds where only chasers near the target matter.
+    """
+
+    def __init__(self, cols, rows, bounds, max_distance=None):
+        self.cols, self.rows = cols, rows
+        self.bounds = bounds
+        self.max_distance = max_distance
+        self.target = None
+        self.reached = 0 # Cells the last search got to
+        self.rebuilds = 0
+        self._blocked = {} # cell -> number of obstacles on it
+        self._neighbors = {} # cell -> walkable neighbour cells; patched as obstacles change
+        self._offsets = {dy * cols + dx: (dx, dy) for dx, dy in STEPS}
+        # Steps to the target, tagged with the search that wrote them (search << shift | steps), so a new
+        # search never has to wipe the grid: anything below its own tag is unvisited
+        self._dist = [0] * (cols * rows)
+        self._shift, self._search = (cols * rows).bit_length(), 0
+        self._steps = {} # cell -> best (dx, dy) for this search, filled on first lookup
+        self._dirty = True
+        self._dense = None # NumPy step grids for swarm lookups, filled on demand
+        self._blocked_dense = None # NumPy unwalkable-cell grid for swarm body checks, kept in step once built
+
+    # --- Changes ---
+    def set_target(self, col, row):
+        cell = row * self.cols + col
+        if cell != self.target: self.target, self._dirty = cell, True
+
+    def block(self, col, row):
+        cell = row * self.cols + col
+        count = self._blocked.get(cell, 0)
+        self._blocked[cell] = count + 1
+        if not count:
+            self._walkability_changed(col, row)
+            if self._blocked_dense is not None: self._blocked_dense[row + 1, col + 1] = True
+
+    def unblock(self, col, row):
+        cell = row * self.cols + col
+        count = self._blocked.get(cell, 0)
+        if count > 1: self._blocked[cell] = count - 1
+        elif count == 1:
+            del self._blocked[cell]; self._walkability_changed(col, row)
+            if self._blocked_dense is not None: self._blocked_dense[row + 1, col + 1] = False
+
+    def clear_blocked(self):
+        if self._blocked: self._blocked.clear(); self._neighbors.clear(); self._dirty = True; self._blocked_dense = None
+
+    def _walkability_changed(self, col, row):
+        # Steps into the cell and diagonals past its corners all start in the surrounding 3x3
+        cols, neighbors = self.cols, self._neighbors
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1): neighbors.pop((row + dy) * cols + col + dx, None)
+        self._dirty = True
+
+    # --- Search ---
+    def _walkable(self, col, row):
+        col0, row0, col1, row1 = self.bounds
+        return col0 <= col <= col1 and row0 <= row <= row1 and (row * self.cols + col) not in self._blocked
+
+    def area_clear(self, col0, row0, col1, row1):
+        """True if every cell from (col0, row0) to (col1, row1) inclusive can be walked through."""
+        bc0, br0, bc1, br1 = self.bounds
+        if col0 < bc0 or row0 < br0 or col1 > bc1 or row1 > br1: return False
+        blocked = self._blocked
+        if not blocked: return True
+        cols = self.cols
+        for row in range(row0, row1 + 1):
+            for cell in range(row * cols + col0, row * cols + col1 + 1):
+                if cell in blocked: return False
+        return True
+
+    def _neighbors_of(self, cell):
+        row, col = divmod(cell, self.cols)
+        walkable = self._walkable
+        steps = []
+        for dx, dy in STEPS:
+            if not walkable(col + dx, row + dy): continue
+            if dx and dy and not (walkable(col + dx, row) and walkable(col, row + dy)): continue
+            steps.append((row + dy) * self.cols + col + dx)
+        steps = self._neighbors[cell] = tuple(steps)
+        return steps
+
+    def refresh(self):
+        """Redo the search if the target or the obstacles changed since the last one."""
+        if not self._dirty: return
+        self._dirty = False
+        self.rebuilds += 1
+        self._steps = {}
+        if self._dense is not None: self._dense[3][:] = False
+        self._search += 1
+        base = self._search << self._shift
+        target = self.target
+        if target is None or not self._walkable(target % self.cols, target // self.cols):
+            self.reached = 0; return
+        dist, frontier, depth, reached = self._dist, [target], base, 1
+        dist[target] = base
+        limit = base + (self.max_distance if self.max_distance is not None else self.cols * self.rows)
+        neighbors, neighbors_of = self._neighbors, self._neighbors_of
+        while frontier and depth < limit:
+            depth += 1
+            next_frontier = []
+            for cell in frontier:
+                steps = neighbors.get(cell)
+                if steps is None: steps = neighbors_of(cell)
+                for other in steps:
+                    if dist[other] < base: dist[other] = depth; next_frontier.append(other)
+            reached += len(next_frontier)
+            frontier = next_frontier
+        self.reached = reached
+
+    # --- Lookups ---
+    def direction(self, col, row):
+        """(dx, dy) step toward the target from a cell; None on the target, off the field or out of reach."""
+        if self._dirty: self.refresh()
+        if not (0 <= col < self.cols and 0 <= row < self.rows): return None
+        cell = row * self.cols + col
+        step = self._steps.get(cell, _UNSET)
+        if step is _UNSET: step = self._steps[cell] = self._best_step(cell, col, row)
+        return step
+
+    def _best_step(self, cell, col, row):
+        dist, base = self._dist, self._search << self._shift
+        if dist[cell] <= base: return None # Unvisited, or the target itself
+        # Of the neighbours one step closer, take the one most in line with the target
+        closer = dist[cell] - 1
+        tcol, trow = self.target % self.cols, self.target // self.cols
+        sx, sy = _sign(tcol - col), _sign(trow - row)
+        best, best_score = None, -3
+        steps = self._neighbors.get(cell)
+        if steps is None: steps = self._neighbors_of(cell)
+        for other in steps:
+            if dist[other] == closer:
+                step = self._offsets[other - cell]
+                score = step[0] * sx + step[1] * sy
+                if score > best_score: best, best_score = step, score
+        return best
+
+    def directions(self, cols, rows):
+        """`direction` for NumPy arrays of cells: (dx, dy, found) arrays."""
+        if self._dirty: self.refresh()
+        if self._dense is None:
+            size = self.cols * self.rows
+            self._dense = (np.zeros(size, dtype=np.int8), np.zeros(size, dtype=np.int8), np.zeros(size, dtype=bool), np.zeros(size, dtype=bool))
+        step_x, step_y, found, known = self._dense
+        inside = (cols >= 0) & (cols < self.cols) & (rows >= 0) & (rows < self.rows)
+        cells = np.where(inside, rows * self.cols + cols, 0)
+        # Work out each cell's step once per search, however many enemies stand in it
+        for cell in np.unique(cells[inside & ~known[cells]]).tolist():
+            step = self.direction(cell % self.cols, cell // self.cols)
+            known[cell], found[cell] = True, step is not None
+            if step is not None: step_x[cell], step_y[cell] = step
+        return step_x[cells], step_y[cells], found[cells] & inside
+
+    def areas_clear(self, cols0, rows0, cols1, rows1):
+        """`area_clear` for NumPy arrays of spans at most two cells wide and high, as one-cell bodies cover."""
+        cols, rows = self.cols, self.rows
+        if self._blocked_dense is None:
+            # Padded by a ring of blocked cells, so anything off the grid clips onto one
+            col0, row0, col1, row1 = self.bounds
+            blocked = np.ones((rows + 2, cols + 2), dtype=bool)
+            blocked[row0 + 1:row1 + 2, col0 + 1:col1 + 2] = False
+            for cell in self._blocked: blocked[cell // cols + 1, cell % cols + 1] = True
+            self._blocked_dense = blocked
+        blocked = self._blocked_dense
+        cols0, cols1 = np.clip(cols0, -1, cols) + 1, np.clip(cols1, -1, cols) + 1
+        rows0, rows1 = np.clip(rows0, -1, rows) + 1, np.clip(rows1, -1, rows) + 1
+        return ~(blocked[rows0, cols0] | blocked[rows0, cols1] | blocked[rows1, cols0] | blocked[rows1, cols1])
+
+
+if __name__ == '__main__':
+    # Cost of one search against the number of chasers steering by it, on the classic board
+    import random
+    import time
+
+    cols = rows = 40
+    field = FlowField(cols, rows, (1, 1, cols - 2, rows - 2))
+    rng = random.Random(0)
+    for _ in range(300): field.block(rng.randrange(1, cols - 1), rng.randrange(1, rows - 1))
+    repeats = 50
+    start = time.perf_counter()
+    for i in range(repeats): field.set_target(5 + i % 30, 20); field.refresh()
+    print(f"search over {field.reached} reachable cells: {(time.perf_counter() - start) * 1000 / repeats:.3f} ms")
+    for chasers in (10, 100, 1000, 10000):
+        spots = [(rng.randrange(1, cols - 1), rng.randrange(1, rows - 1)) for _ in range(chasers)]
+        start = time.perf_counter()
+        for col, row in spots: field.direction(col, row)
+        print(f"{chasers:>6} chasers: {(time.perf_counter() - start) * 1000:.3f} ms of lookups")
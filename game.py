@@ -1,23 +1,37 @@
-import pygame
-import random
 import time
-import math
+_import_start = time.perf_counter()
+
+import json
+import os
+import random
+import sys
+from collections import OrderedDict
+
+import pygame
 
-pygame.init()
-pygame.mixer.init()
+from audio import AudioManager
+from profiler import FrameProfiler
+from replay import InputRecorder
+from sim import GameSim, Inputs, WIDTH, HEIGHT, snake_block, game_speed, game_border_thickness, BOSS_SIZE, DIRECTIONS, TURN_BUFFER_SIZE, CHUNK_SIZE
 
-# Load sounds
-eat_sound = pygame.mixer.Sound("eat.mp3")
-bomb_sound = pygame.mixer.Sound("bomb.mp3")
-# victory_sound will be loaded on demand
-# warning_sound = pygame.mixer.Sound("warning.mp3")
-# rage_sound = pygame.mixer.Sound("rage_activate.mp3") # Optional sound for rage mode
-pygame.mixer.music.load("bgm.mp3") # Load default BGM
+# Nothing below touches SDL at import time; init_game() opens the window and
+# fonts, and the AudioManager opens the mixer and loads sounds on its own thread.
 
-# Screen setup
-WIDTH, HEIGHT = 800, 800
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Hungry Snake - Boss RAGE!")
+FONT_NAME = None # None = pygame's bundled default font, no system font scan needed
+FONT_CACHE_FILE = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'hungry_snake', 'fonts.json')
+
+screen = None
+clock = None
+font_small = font_medium = font_large = font_xlarge = None
+font_tiny = None # Profiler overlay
+profiler = None # FrameProfiler; F3 or HUNGRY_SNAKE_PROFILE=1 turns it on
+
+audio = None # AudioManager
+# Load order: the opening track, the in-game effects, then what is needed later
+AUDIO_PRELOAD = ("bgm.mp3", "eat.mp3", "bomb.mp3", "boss.mp3", "victory.mp3")
+
+startup_times = {} # phase -> seconds, filled in as startup progresses
+show_startup_times = False
 
 # Colors
 WHITE = (255, 255, 255)
@@ -30,50 +44,145 @@ YELLOW = (255, 255, 0)
 PURPLE = (128, 0, 128) # Default Boss Color
 DARK_RED = (139, 0, 0) # Boss Rage Color
 ORANGE = (255, 165, 0)
+FLOOR_LINES = (40, 40, 40) # Scrolling worlds only
+
+DIRTY_RECT_LIMIT = 300 # Past this many rects a full-screen fill/update is cheaper
+
+DIRECTION_KEYS = {pygame.K_w: 'UP', pygame.K_UP: 'UP', pygame.K_s: 'DOWN', pygame.K_DOWN: 'DOWN',
+                  pygame.K_a: 'LEFT', pygame.K_LEFT: 'LEFT', pygame.K_d: 'RIGHT', pygame.K_RIGHT: 'RIGHT'}
+
+# Rendered text surfaces, least recently used first
+TEXT_CACHE_SIZE = 128
+text_cache = OrderedDict()
 
-# Clock and font
-clock = pygame.time.Clock()
-font_small = pygame.font.SysFont(None, 35)
-font_medium = pygame.font.SysFont(None, 50)
-font_large = pygame.font.SysFont(None, 75)
-font_xlarge = pygame.font.SysFont(None, 100)
-
-snake_block = 20
-game_speed = 60
-enemy_base_speed = 1.1 # Adjusted for balance
-dart_speed_value = 15
-game_border_thickness = 20
-
-BOSS_TRIGGER_SCORE = 10 # Adjusted for easier testing, revert to 200 for release
-DART_COOLDOWN_TIME = 1.0
-BOSS_BASE_SPEED_NORMAL = enemy_base_speed * 1.05 # Normal boss speed
-BOSS_MAX_HEALTH_HITS = 15
-SNAKE_MOVE_INTERVAL = 0.08
-BOSS_WARNING_DURATION = 3
-
-def get_random_pos_unoccupied(item_size, occupied_rects, border=game_border_thickness):
-    max_attempts = 100
-    for _ in range(max_attempts):
-        x = random.randrange(border, WIDTH - border - item_size, snake_block)
-        y = random.randrange(border, HEIGHT - border - item_size, snake_block)
-        potential_rect = pygame.Rect(x, y, item_size, item_size)
-        is_occupied = False
-        if occupied_rects:
-            for occupied_rect in occupied_rects:
-                if occupied_rect and potential_rect.colliderect(occupied_rect):
-                    is_occupied = True; break
-        if not is_occupied: return [x, y]
-    return [random.randrange(border, WIDTH - border - item_size, snake_block),
-            random.randrange(border, HEIGHT - border - item_size, snake_block)]
-
-def message(msg, color, x, y, font_to_use=font_small, center_x=False, center_y=False):
-    mesg = font_to_use.render(msg, True, color)
+def render_text(font_to_use, msg, color, antialias=True):
+    key = (font_to_use, msg, tuple(color), antialias)
+    mesg = text_cache.get(key)
+    if mesg is None:
+        mesg = text_cache[key] = font_to_use.render(msg, antialias, color)
+        if len(text_cache) > TEXT_CACHE_SIZE: text_cache.popitem(last=False)
+    else:
+        text_cache.move_to_end(key)
+    return mesg
+
+def message(msg, color, x, y, font_to_use=None, center_x=False, center_y=False):
+    mesg = render_text(font_to_use or font_small, msg, color)
     text_rect = mesg.get_rect()
     if center_x: text_rect.centerx = x
     else: text_rect.x = x
     if center_y: text_rect.centery = y
     else: text_rect.y = y
-    screen.blit(mesg, text_rect)
+    return screen.blit(mesg, text_rect)
+
+def counter_message(label, value, color, x, y, font_to_use=None):
+    """HUD line like "Score: 35", built from the cached label and per-digit glyphs."""
+    font_to_use = font_to_use or font_small
+    mesg = render_text(font_to_use, label, color)
+    drawn = screen.blit(mesg, (x, y)); x += mesg.get_width()
+    for digit in str(value):
+        mesg = render_text(font_to_use, digit, color)
+        drawn.union_ip(screen.blit(mesg, (x, y))); x += mesg.get_width()
+    return drawn
+
+def prerender_static_text():
+    # Pre-render everything static so the first frames don't pay for it
+    for font_to_use, msg, color in [(font_small, "Score: ", WHITE), (font_small, "Shockwave: ", WHITE), (font_small, "Darts: ", WHITE),
+                                    (font_small, "Dart CD", WHITE), (font_small, "BOSS", WHITE),
+                                    (font_xlarge, "WARNING!", RED), (font_large, "BOSS INCOMING!", RED),
+                                    (font_large, "Game Over!", RED), (font_large, "VICTORY!", GREEN), (font_medium, "Play Again? (Y/N)", YELLOW)]:
+        render_text(font_to_use, msg, color)
+    for digit in "0123456789-": render_text(font_small, digit, WHITE)
+
+# --- Sprite atlas ---
+# key -> (surface, offset from the entity rect's topleft). Each image is baked
+# by the same pygame.draw call that used to run per entity per frame, so one
+# batched screen.blits() puts down exactly the pixels the primitives did.
+sprites = {}
+
+def bake_sprite(key, draw, size):
+    """Keep the pixels `draw(surface, rect)` touches for an entity rect `size` wide."""
+    canvas = pygame.Surface((size * 3, size * 3), pygame.SRCALPHA)
+    drawn = draw(canvas, pygame.Rect(size, size, size, size))
+    sprites[key] = (canvas.subsurface(drawn).copy().convert_alpha(), (drawn.x - size, drawn.y - size))
+    return sprites[key]
+
+def rect_sprite(color, width, height):
+    key = ('rect', color, width, height)
+    sprite = sprites.get(key)
+    if sprite is None:
+        image = pygame.Surface((width, height)).convert(); image.fill(color)
+        sprite = sprites[key] = (image, (0, 0))
+    return sprite
+
+def build_sprite_atlas():
+    for color in (RED, YELLOW): rect_sprite(color, snake_block, snake_block)
+    for color in (PURPLE, DARK_RED): rect_sprite(color, BOSS_SIZE, BOSS_SIZE)
+    for color in (GREEN, BLUE):
+        bake_sprite(('item', color), lambda surface, r, color=color: pygame.draw.circle(surface, color, r.center, snake_block // 2), snake_block)
+    for direction in DIRECTIONS:
+        bake_sprite(('dart', direction), lambda surface, r, direction=direction: draw_triangle_dart(surface, GRAY, r, direction), snake_block)
+
+# --- Startup ---
+def resolve_font_path(name):
+    """File for a system font name, remembered in FONT_CACHE_FILE so fontconfig is scanned once."""
+    if name is None: return None
+    try:
+        with open(FONT_CACHE_FILE) as f: cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    if name in cache and (cache[name] is None or os.path.exists(cache[name])): return cache[name]
+    cache[name] = pygame.font.match_font(name) # Slow: scans the system fonts
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_FILE), exist_ok=True)
+        with open(FONT_CACHE_FILE, 'w') as f: json.dump(cache, f)
+    except OSError as e:
+        print(f"Could not write font cache {FONT_CACHE_FILE}: {e}")
+    return cache[name]
+
+def play_sound(name):
+    if audio: audio.play_sound(name)
+
+def play_music(music_file):
+    """Crossfade to a looping music file, falling back to bgm.mp3; queued until it is loaded."""
+    if audio: audio.play_music(music_file)
+
+def stop_music():
+    if audio: audio.stop_music()
+
+def init_game():
+    """Open the window and fonts; starts audio loading in the background."""
+    global screen, clock, font_small, font_medium, font_large, font_xlarge, font_tiny, profiler, audio
+    if screen is not None: return
+    start = time.perf_counter()
+    audio = AudioManager(AUDIO_PRELOAD, timings=startup_times); audio.start()
+
+    # Only the subsystems the game uses, rather than pygame.init()
+    pygame.display.init(); pygame.font.init()
+    startup_times['display/font init'] = time.perf_counter() - start; mark = time.perf_counter()
+
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Hungry Snake - Boss RAGE!")
+    clock = pygame.time.Clock()
+    startup_times['window'] = time.perf_counter() - mark; mark = time.perf_counter()
+
+    font_path = resolve_font_path(FONT_NAME)
+    font_small = pygame.font.Font(font_path, 35)
+    font_medium = pygame.font.Font(font_path, 50)
+    font_large = pygame.font.Font(font_path, 75)
+    font_xlarge = pygame.font.Font(font_path, 100)
+    font_tiny = pygame.font.Font(font_path, 20)
+    startup_times['fonts'] = time.perf_counter() - mark; mark = time.perf_counter()
+
+    prerender_static_text()
+    profiler = FrameProfiler.from_env()
+    startup_times['text prerender'] = time.perf_counter() - mark; mark = time.perf_counter()
+
+    build_sprite_atlas()
+    startup_times['sprite atlas'] = time.perf_counter() - mark
+
+def report_startup_times():
+    print("Startup times:")
+    for phase, seconds in startup_times.items(): print(f"  {phase:<22} {seconds * 1000:8.1f} ms")
 
 def draw_triangle_dart(surface, color, dart_rect, direction):
     points = []
@@ -84,348 +193,204 @@ def draw_triangle_dart(surface, color, dart_rect, direction):
     elif direction == 'DOWN': points = [(cx, cy + half_size), (cx - half_size, cy - half_size), (cx + half_size, cy - half_size)]
     elif direction == 'LEFT': points = [(cx - half_size, cy), (cx + half_size, cy - half_size), (cx + half_size, cy + half_size)]
     elif direction == 'RIGHT': points = [(cx + half_size, cy), (cx - half_size, cy - half_size), (cx - half_size, cy + half_size)]
-    elif isinstance(direction, tuple): pygame.draw.circle(surface, color, (cx,cy), half_size); return
-    if points: pygame.draw.polygon(surface, color, points)
-    else: pygame.draw.rect(surface, color, dart_rect)
-
-def get_dart_vectors(base_direction_str, num_darts, spread_angle_deg=15):
-    vectors = []
-    base_angle_rad = 0
-    if base_direction_str == 'UP': base_angle_rad = math.radians(-90)
-    elif base_direction_str == 'DOWN': base_angle_rad = math.radians(90)
-    elif base_direction_str == 'LEFT': base_angle_rad = math.radians(180)
-    elif base_direction_str == 'RIGHT': base_angle_rad = math.radians(0)
-    if num_darts == 1:
-        vectors.append((math.cos(base_angle_rad) * dart_speed_value, math.sin(base_angle_rad) * dart_speed_value))
+    elif isinstance(direction, tuple): return pygame.draw.circle(surface, color, (cx,cy), half_size)
+    if points: return pygame.draw.polygon(surface, color, points)
+    else: return pygame.draw.rect(surface, color, dart_rect)
+
+def read_inputs(events):
+    """Translate pygame events into a list of Inputs, one per press in the order they happened. Returns None on QUIT.
+
+    Each direction key is kept on its own, so two quick turns in one frame both
+    reach GameSim.queue_input, which checks each against the one before it.
+    """
+    presses = []
+    for event in events:
+        if event.type == pygame.QUIT: return None
+        if event.type == pygame.KEYDOWN and event.key in DIRECTION_KEYS: presses.append(Inputs(DIRECTION_KEYS[event.key]))
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button == 1: presses.append(Inputs(fire=True))
+            if event.button == 3: presses.append(Inputs(shockwave=True))
+    return presses
+
+def draw_world_floor(sim, view):
+    """Chunk lines and the wall outline of a scrolling world, so movement reads against something."""
+    drawn = []
+    dx, dy = -view.x, -view.y
+    for x in range(-(-view.left // CHUNK_SIZE) * CHUNK_SIZE, view.right, CHUNK_SIZE):
+        drawn.append(pygame.draw.line(screen, FLOOR_LINES, (x + dx, 0), (x + dx, HEIGHT - 1)))
+    for y in range(-(-view.top // CHUNK_SIZE) * CHUNK_SIZE, view.bottom, CHUNK_SIZE):
+        drawn.append(pygame.draw.line(screen, FLOOR_LINES, (0, y + dy), (WIDTH - 1, y + dy)))
+    walls = sim.world_rect.inflate(-2 * game_border_thickness, -2 * game_border_thickness).move(dx, dy)
+    for start, end in ((walls.topleft, walls.topright), (walls.bottomleft, walls.bottomright),
+                       (walls.topleft, walls.bottomleft), (walls.topright, walls.bottomright)):
+        if screen.get_rect().clipline(start, end): drawn.append(pygame.draw.line(screen, GRAY, start, end, 2))
+    return drawn
+
+def draw_sim(sim):
+    """Draw one frame of play; returns the screen rects touched.
+
+    Everything in the world is drawn relative to the sim's camera, which only
+    moves in worlds bigger than the window; there, bombs and enemies come
+    from grid queries over the view instead of the full lists.
+    """
+    drawn = []; add = drawn.append
+    current_time = sim.time
+    game_state = sim.game_state
+    view = sim.camera_rect()
+    dx, dy = -view.x, -view.y
+    if sim.large_world: drawn += draw_world_floor(sim, view)
+    snake_rect = sim.snake_rect
+    add(pygame.draw.rect(screen, WHITE, snake_rect.move(dx, dy)))
+    if game_state in ["PLAYING", "BOSS_WARNING"]:
+        batch = []
+        for color, item_r in ((GREEN, sim.apple_rect), (BLUE, sim.blue_item_rect)):
+            if item_r:
+                image, (ox, oy) = sprites['item', color]; batch.append((image, (item_r.x + ox + dx, item_r.y + oy + dy)))
+        bombs, enemy_rects = (sim.bomb_rects(view), sim.enemy_rects(view)) if sim.large_world else (sim.bomb_rects(), sim.enemy_rects())
+        image = rect_sprite(RED, snake_block, snake_block)[0]
+        batch += [(image, (r[0] + dx, r[1] + dy)) for r in bombs]
+        image = rect_sprite(YELLOW, snake_block, snake_block)[0]
+        batch += [(image, (r[0] + dx, r[1] + dy)) for r in enemy_rects]
+        drawn += screen.blits(batch)
+    if game_state == "BOSS_WARNING":
+        if int(current_time * 2) % 2 == 0:
+            add(message("WARNING!", RED, WIDTH // 2, HEIGHT // 2 - 50, font_xlarge, center_x=True, center_y=True))
+            add(message("BOSS INCOMING!", RED, WIDTH // 2, HEIGHT // 2 + 50, font_large, center_x=True, center_y=True))
+    if game_state == "BOSS_FIGHT" and sim.boss_rect:
+        boss_color = DARK_RED if sim.boss_rage_mode_active else PURPLE
+        add(screen.blit(rect_sprite(boss_color, sim.boss_rect.w, sim.boss_rect.h)[0], sim.boss_rect.move(dx, dy)))
+        hbw, hbh = 200, 20; chw = max(0, (sim.boss_health / sim.boss_max_health) * hbw)
+        add(pygame.draw.rect(screen, RED, [WIDTH // 2 - hbw // 2, 30, hbw, hbh]))
+        pygame.draw.rect(screen, ORANGE, [WIDTH // 2 - hbw // 2, 30, chw, hbh])
+        add(message("BOSS", WHITE, WIDTH//2, 10, font_small, center_x=True))
+    if sim.darts:
+        batch = []
+        for dart in sim.darts:
+            if not view.colliderect(dart.rect): continue
+            image, (ox, oy) = sprites['dart', dart.visual_direction_str]
+            batch.append((image, (dart.rect.x + ox + dx, dart.rect.y + oy + dy)))
+        drawn += screen.blits(batch)
+    if sim.shockwave_active: add(pygame.draw.circle(screen, BLUE, (snake_rect.centerx + dx, snake_rect.centery + dy), int(sim.shockwave_radius), 3))
+    add(counter_message("Score: ", sim.score, WHITE, 10, 10)); add(counter_message("Shockwave: ", sim.shockwave_charges, WHITE, 10, 40)); add(counter_message("Darts: ", sim.num_darts_per_shot, WHITE, 10, 70))
+    ccp = (current_time - sim.last_dart_time) / sim.dart_cooldown; dbw = 100 * min(1, ccp if not sim.dart_ready else 1)
+    bar_col = GREEN if sim.dart_ready else RED
+    pygame.draw.rect(screen, bar_col, [10, HEIGHT - 30, dbw, 10]); add(pygame.draw.rect(screen, WHITE, [10, HEIGHT - 30, 100, 10], 2))
+    add(message("Dart CD", WHITE, 120, HEIGHT - 35))
+    return drawn
+
+def merge_dirty_rects(rects):
+    """Coalesce overlapping rects for display.update; None when a full update is cheaper."""
+    if len(rects) > DIRTY_RECT_LIMIT: return None
+    merged = []
+    for r in sorted(rects, key=lambda r: (r.y, r.x)):
+        if not r.w or not r.h: continue
+        for m in merged:
+            if m.colliderect(r): m.union_ip(r); break
+        else: merged.append(pygame.Rect(r))
+    return merged
+
+def play_sim_events(sim):
+    for sim_event in sim.events:
+        if sim_event == 'eat': play_sound('eat')
+        elif sim_event == 'bomb': play_sound('bomb')
+        elif sim_event == 'boss_fight': play_music("boss.mp3")
+
+def game_loop(seed=None, swarm=False, dirty_rects=True, record_path=None, replay=None, turn_buffer=TURN_BUFFER_SIZE, immediate_turns=False,
+              world_size=None, flow_field=True):
+    """Play one game. With `record_path` the session's inputs are saved there
+    when it ends; with a replay.Replay the recorded inputs drive the game."""
+    init_game()
+    if replay is not None:
+        sim = replay.new_sim()
     else:
-        angle_offsets_rad = []
-        if num_darts == 2:
-            half_spread = math.radians(spread_angle_deg / 2)
-            angle_offsets_rad = [-half_spread, half_spread]
-        elif num_darts >= 3:
-            spread_rad = math.radians(spread_angle_deg)
-            angle_offsets_rad = [-spread_rad, 0, spread_rad]
-        for offset in angle_offsets_rad:
-            current_angle_rad = base_angle_rad + offset
-            dx = math.cos(current_angle_rad) * dart_speed_value
-            dy = math.sin(current_angle_rad) * dart_speed_value
-            vectors.append((dx, dy))
-    return vectors
-
-def game_loop():
-    game_state = "PLAYING"
-    x, y = WIDTH // 2, HEIGHT // 2
-    snake_visual_size = snake_block
-    score = 0
-
-    snake_vx, snake_vy = 0, 0
-    last_committed_vx, last_committed_vy = 0, 0 # Initialize to 0,0
-    last_snake_move_time = 0
-    snake_move_interval = SNAKE_MOVE_INTERVAL
-
-    apple_pos, apple_rect = None, None
-    blue_item_pos, blue_item_rect = None, None
-    blue_item_active_timer, apples_eaten_for_blue_item, blue_items_eaten_this_game = 0, 0, 0
-    blue_item_spawn_delay = 7
-
-    darts, dart_ready, last_dart_time = [], True, 0
-    dart_cooldown = DART_COOLDOWN_TIME
-    snake_facing_direction_str = 'UP'
-    num_darts_per_shot = 1
-
-    enemies, num_enemies_to_spawn_next, last_enemy_cleared_time = [], 1, 0
-    enemy_respawn_delay = 5
-
-    bombs, last_bomb_spawn_time = [], time.time()
-    bomb_spawn_interval, max_bombs_on_screen = 10, 15
-
-    shockwave_active, shockwave_radius, shockwave_charges, max_shockwave_charges = False, 0, 1, 5
-    max_shockwave_radius = 250
-
-    boss_rect, boss_health = None, 0
-    boss_max_health = BOSS_MAX_HEALTH_HITS
-    current_boss_speed = BOSS_BASE_SPEED_NORMAL
-    boss_rage_mode_active = False
-    boss_size = snake_block * 3
-
-    warning_start_time = 0
-
-    snake_rect = pygame.Rect(x, y, snake_visual_size, snake_visual_size)
-
-    def get_current_occupied_rects():
-        occupied = [snake_rect, apple_rect, blue_item_rect]
-        occupied.extend(bombs); occupied.extend([e['rect'] for e in enemies])
-        if boss_rect: occupied.append(boss_rect)
-        return [r for r in occupied if r is not None]
-
-    def spawn_apple():
-        nonlocal apple_pos, apple_rect
-        apple_pos = tuple(get_random_pos_unoccupied(snake_block, get_current_occupied_rects()))
-        apple_rect = pygame.Rect(apple_pos[0], apple_pos[1], snake_block, snake_block)
-
-    def spawn_blue_item():
-        nonlocal blue_item_pos, blue_item_rect, blue_item_active_timer
-        blue_item_pos = tuple(get_random_pos_unoccupied(snake_block, get_current_occupied_rects()))
-        blue_item_rect = pygame.Rect(blue_item_pos[0], blue_item_pos[1], snake_block, snake_block)
-        blue_item_active_timer = time.time()
-
-    def spawn_enemies_wave(count):
-        nonlocal enemies
-        current_occupied = get_current_occupied_rects()
-        for _ in range(count):
-            ex, ey = get_random_pos_unoccupied(snake_block, current_occupied)
-            new_enemy_rect = pygame.Rect(ex, ey, snake_block, snake_block)
-            enemies.append({'rect': new_enemy_rect, 'speed': enemy_base_speed + random.uniform(-0.2, 0.2)}) # Slightly vary speed
-            current_occupied.append(new_enemy_rect)
-
-    def add_new_bomb_item():
-        nonlocal bombs
-        if len(bombs) >= max_bombs_on_screen: return
-        bx, by = get_random_pos_unoccupied(snake_block, get_current_occupied_rects())
-        bombs.append(pygame.Rect(bx, by, snake_block, snake_block))
-
-    def initialize_boss_fight():
-        nonlocal game_state, enemies, bombs, apple_pos, apple_rect, blue_item_pos, blue_item_rect
-        nonlocal boss_rect, boss_health, current_boss_speed, boss_rage_mode_active
-        game_state = "BOSS_FIGHT"
-        enemies.clear(); bombs.clear(); apple_pos, apple_rect, blue_item_pos, blue_item_rect = None, None, None, None
-        darts.clear()
-        boss_x, boss_y = WIDTH // 2 - boss_size // 2, game_border_thickness + 20
-        boss_rect, boss_health = pygame.Rect(boss_x, boss_y, boss_size, boss_size), boss_max_health
-        current_boss_speed = BOSS_BASE_SPEED_NORMAL
-        boss_rage_mode_active = False
-        
-        pygame.mixer.music.stop()
-        try:
-            pygame.mixer.music.load("boss.mp3") 
-            pygame.mixer.music.play(-1)
-        except pygame.error as e:
-            print(f"Could not load or play boss.mp3: {e}. Playing default BGM.")
-            pygame.mixer.music.load("bgm.mp3")
-            pygame.mixer.music.play(-1)
-
-
-    spawn_apple()
-    if not enemies: spawn_enemies_wave(num_enemies_to_spawn_next); last_enemy_cleared_time = time.time()
+        if seed is None and record_path: seed = random.randrange(2 ** 31) # Recordings need a known seed
+        sim = GameSim(seed, swarm=swarm, turn_buffer=turn_buffer, immediate_turns=immediate_turns, world_size=world_size,
+                      flow_field=flow_field)
+    recorder = None
+    if record_path:
+        recorder = sim.recorder = InputRecorder(seed, swarm, turn_buffer, immediate_turns, world_size, flow_field)
+    game_state = sim.game_state
+    clock.tick() # Don't count time spent before the first frame
+    # Dirty-rect mode: clear only what was drawn last frame and push only what changed
+    previous_rects, last_drawn_state = None, None
 
     running_game_logic = True
+    profiler.begin_frame()
     while running_game_logic:
-        current_time = time.time()
-        screen.fill(BLACK)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: running_game_logic = False; return "QUIT"
-            if game_state in ["PLAYING", "BOSS_FIGHT", "BOSS_WARNING"]:
-                if event.type == pygame.KEYDOWN:
-                    # Store potential new direction
-                    potential_new_vx, potential_new_vy = snake_vx, snake_vy
-                    potential_new_facing_str = snake_facing_direction_str
-
-                    if (event.key == pygame.K_w or event.key == pygame.K_UP):
-                        potential_new_vx, potential_new_vy, potential_new_facing_str = 0, -1, 'UP'
-                    elif (event.key == pygame.K_s or event.key == pygame.K_DOWN):
-                        potential_new_vx, potential_new_vy, potential_new_facing_str = 0, 1, 'DOWN'
-                    elif (event.key == pygame.K_a or event.key == pygame.K_LEFT):
-                        potential_new_vx, potential_new_vy, potential_new_facing_str = -1, 0, 'LEFT'
-                    elif (event.key == pygame.K_d or event.key == pygame.K_RIGHT):
-                        potential_new_vx, potential_new_vy, potential_new_facing_str = 1, 0, 'RIGHT'
-                    
-                    # Check for 180-degree turn against the *last committed* direction
-                    # Allow change if snake is stationary (last_committed_vx/vy are 0)
-                    can_change_direction = True
-                    if (last_committed_vx != 0 or last_committed_vy != 0): # If snake was moving
-                        if potential_new_vx == -last_committed_vx and potential_new_vy == -last_committed_vy:
-                            can_change_direction = False
-                    
-                    if can_change_direction:
-                        snake_vx, snake_vy = potential_new_vx, potential_new_vy
-                        snake_facing_direction_str = potential_new_facing_str
-                
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1 and dart_ready:
-                        dart_ready, last_dart_time = False, current_time
-                        dart_vectors = get_dart_vectors(snake_facing_direction_str, num_darts_per_shot)
-                        for dv_x, dv_y in dart_vectors:
-                            dsx, dsy = snake_rect.centerx, snake_rect.centery
-                            ndr = pygame.Rect(dsx - snake_block // 2, dsy - snake_block // 2, snake_block, snake_block)
-                            darts.append({'rect': ndr, 'exact_x': float(ndr.x), 'exact_y': float(ndr.y), 
-                                          'dx': dv_x, 'dy': dv_y, 'visual_direction_str': snake_facing_direction_str})
-                    if event.button == 3 and shockwave_charges > 0 and not shockwave_active:
-                        shockwave_active, shockwave_radius, shockwave_charges = True, 1, shockwave_charges - 1
-
+        events = pygame.event.get()
+        for event in events:
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3: profiler.toggle(); previous_rects = None
+        prof = profiler if profiler.enabled else None
+        sim.profiler = prof
+        presses = read_inputs(events)
+        if replay is not None and replay.end and sim.is_active and sim.tick_count >= replay.end['tick']: presses = None # Recording stopped here
+        if presses is None:
+            if recorder: recorder.save(record_path, sim)
+            running_game_logic = False; return "QUIT"
+        if prof: prof.mark('events')
+
+        # Simulation runs in fixed SIM_DT ticks regardless of how long the last frame took
+        dt = clock.get_time() / 1000.0
+        ticks_run, turns_applied = 0, sim.turns_applied
+        if sim.is_active:
+            for pressed in presses: sim.queue_input(pressed)
+            ticks_run = sim.step(dt)
+            if prof: prof.mark('sim: other')
+            play_sim_events(sim)
+            if prof: prof.mark('audio')
+        game_state = sim.game_state
+
+        update_rects = None
         if game_state in ["PLAYING", "BOSS_FIGHT", "BOSS_WARNING"]:
-            if current_time - last_snake_move_time > snake_move_interval:
-                if snake_vx != 0 or snake_vy != 0: 
-                    # Before moving, check if the intended move (snake_vx, snake_vy)
-                    # is a 180 of the last_committed_vx, last_committed_vy
-                    # This is mostly a safeguard; the KEYDOWN logic should handle it.
-                    # However, it's good for situations where snake_vx/vy might be set programmatically.
-                    
-                    # If the snake is trying to move into the block it just came from,
-                    # and it's not stationary, ignore the input for this tick by not moving.
-                    # This effectively makes it "bump" its head and wait for a new valid direction.
-                    
-                    # Simplified: The input logic now more robustly sets snake_vx/vy.
-                    # So, we just commit the move if snake_vx/vy is set.
-                    x += snake_vx * snake_block
-                    y += snake_vy * snake_block
-                    last_committed_vx, last_committed_vy = snake_vx, snake_vy
-                else: # If snake_vx and snake_vy are 0 (player released keys or initial state)
-                      # ensure last_committed direction isn't immediately reversed on next key press
-                      # This case happens if player stops, then presses reverse.
-                      # last_committed_vx/vy are already set from the last actual move.
-                      pass
-
-                last_snake_move_time = current_time
-            
-            snake_rect.topleft = (x, y); snake_rect.size = (snake_visual_size, snake_visual_size)
-            if not (game_border_thickness <= snake_rect.left and snake_rect.right <= WIDTH - game_border_thickness and \
-                    game_border_thickness <= snake_rect.top and snake_rect.bottom <= HEIGHT - game_border_thickness):
-                bomb_sound.play(); game_state = "GAME_OVER"
-            if not dart_ready and current_time - last_dart_time > dart_cooldown: dart_ready = True
-        
-        if game_state == "PLAYING":
-            if score >= BOSS_TRIGGER_SCORE: game_state = "BOSS_WARNING"; warning_start_time = current_time
-            if not blue_item_pos and apples_eaten_for_blue_item >= 3: spawn_blue_item(); apples_eaten_for_blue_item = 0
-            if blue_item_rect and current_time - blue_item_active_timer > blue_item_spawn_delay: blue_item_pos, blue_item_rect = None, None
-            if not enemies and current_time - last_enemy_cleared_time > enemy_respawn_delay:
-                num_enemies_to_spawn_next = min(num_enemies_to_spawn_next * 2, 10)
-                spawn_enemies_wave(num_enemies_to_spawn_next); last_enemy_cleared_time = current_time
-            if current_time - last_bomb_spawn_time > bomb_spawn_interval: add_new_bomb_item(); last_bomb_spawn_time = current_time
-            for enemy in enemies:
-                if snake_rect.centerx > enemy['rect'].centerx: enemy['rect'].x += enemy['speed']
-                elif snake_rect.centerx < enemy['rect'].centerx: enemy['rect'].x -= enemy['speed']
-                if snake_rect.centery > enemy['rect'].centery: enemy['rect'].y += enemy['speed']
-                elif snake_rect.centery < enemy['rect'].centery: enemy['rect'].y -= enemy['speed']
-            if apple_rect and snake_rect.colliderect(apple_rect):
-                eat_sound.play(); score += 5; snake_visual_size = min(snake_visual_size + 2, snake_block * 2.5)
-                apples_eaten_for_blue_item += 1; spawn_apple()
-            if blue_item_rect and snake_rect.colliderect(blue_item_rect):
-                eat_sound.play(); blue_items_eaten_this_game += 1
-                if blue_items_eaten_this_game == 1: num_darts_per_shot = 2
-                elif blue_items_eaten_this_game >= 2: num_darts_per_shot = 3
-                if blue_items_eaten_this_game % 3 == 0: shockwave_charges = min(shockwave_charges + 1, max_shockwave_charges)
-                blue_item_pos, blue_item_rect = None, None
-            for bomb_r in bombs:
-                if snake_rect.colliderect(bomb_r): bomb_sound.play(); game_state = "GAME_OVER"; break
-            if game_state == "GAME_OVER": continue
-            for enemy in enemies:
-                if snake_rect.colliderect(enemy['rect']): bomb_sound.play(); game_state = "GAME_OVER"; break
-            if game_state == "GAME_OVER": continue
-
-        elif game_state == "BOSS_WARNING":
-            if current_time - warning_start_time > BOSS_WARNING_DURATION: initialize_boss_fight()
-            for bomb_r in bombs: 
-                if snake_rect.colliderect(bomb_r): bomb_sound.play(); game_state = "GAME_OVER"; break
-            if game_state == "GAME_OVER": continue
-            for enemy in enemies:
-                if snake_rect.colliderect(enemy['rect']): bomb_sound.play(); game_state = "GAME_OVER"; break
-            if game_state == "GAME_OVER": continue
-        
-        elif game_state == "BOSS_FIGHT":
-            if boss_rect:
-                if snake_rect.centerx > boss_rect.centerx: boss_rect.x += current_boss_speed
-                elif snake_rect.centerx < boss_rect.centerx: boss_rect.x -= current_boss_speed
-                if snake_rect.centery > boss_rect.centery: boss_rect.y += current_boss_speed
-                elif snake_rect.centery < boss_rect.centery: boss_rect.y -= current_boss_speed
-                boss_rect.clamp_ip(screen.get_rect())
-                if snake_rect.colliderect(boss_rect): bomb_sound.play(); game_state = "GAME_OVER"
+            # The flashing boss warning and any state change get a full redraw
+            partial = dirty_rects and previous_rects is not None and game_state == last_drawn_state and game_state != "BOSS_WARNING"
+            if partial:
+                for r in previous_rects: screen.fill(BLACK, r)
+            else:
+                screen.fill(BLACK)
+            drawn = draw_sim(sim)
+            if prof:
+                prof.mark('draw')
+                drawn.append(prof.draw_overlay(screen, font_tiny, WIDTH - 250, 10))
+                prof.mark('profiler overlay')
+            if partial: update_rects = merge_dirty_rects(previous_rects + drawn)
+            previous_rects = drawn if len(drawn) <= DIRTY_RECT_LIMIT else None
+            last_drawn_state = game_state
 
-        if game_state in ["PLAYING", "BOSS_FIGHT", "BOSS_WARNING"]:
-            for dart in list(darts):
-                dart['exact_x'] += dart['dx']; dart['exact_y'] += dart['dy']
-                dart['rect'].topleft = (int(dart['exact_x']), int(dart['exact_y']))
-                if not screen.get_rect().colliderect(dart['rect']): darts.remove(dart); continue
-                dart_consumed = False
-                if game_state in ["PLAYING", "BOSS_WARNING"]: 
-                    for enemy in list(enemies):
-                        if dart['rect'].colliderect(enemy['rect']):
-                            enemies.remove(enemy); score += 10
-                            if dart in darts: darts.remove(dart)
-                            if not enemies and game_state == "PLAYING": last_enemy_cleared_time = current_time
-                            dart_consumed = True; break 
-                if dart_consumed: continue 
-                if game_state == "BOSS_FIGHT" and boss_rect and dart['rect'].colliderect(boss_rect):
-                    boss_health -= 1
-                    if dart in darts: darts.remove(dart)
-                    if not boss_rage_mode_active and boss_health <= boss_max_health / 2:
-                        boss_rage_mode_active = True
-                        current_boss_speed = BOSS_BASE_SPEED_NORMAL * 2
-                    if boss_health <= 0: game_state = "VICTORY"
-            
-            if shockwave_active:
-                shockwave_radius += 10; shockwave_center = snake_rect.center
-                if game_state in ["PLAYING", "BOSS_WARNING"]:
-                    for enemy in list(enemies):
-                        if math.hypot(enemy['rect'].centerx - shockwave_center[0], enemy['rect'].centery - shockwave_center[1]) < shockwave_radius + (enemy['rect'].width // 2):
-                            enemies.remove(enemy); score += 10
-                    if not enemies and game_state == "PLAYING": last_enemy_cleared_time = current_time
-                    for bomb_r in list(bombs):
-                        if math.hypot(bomb_r.centerx - shockwave_center[0], bomb_r.centery - shockwave_center[1]) < shockwave_radius + (bomb_r.width // 2):
-                            bombs.remove(bomb_r); score += 2
-                if game_state == "BOSS_FIGHT" and boss_rect:
-                    if math.hypot(boss_rect.centerx - shockwave_center[0], boss_rect.centery - shockwave_center[1]) < shockwave_radius + (boss_rect.width // 2):
-                        boss_health -= 2; shockwave_active = False
-                        if not boss_rage_mode_active and boss_health <= boss_max_health / 2:
-                            boss_rage_mode_active = True
-                            current_boss_speed = BOSS_BASE_SPEED_NORMAL * 2
-                        if boss_health <= 0: game_state = "VICTORY"
-                if shockwave_radius > max_shockwave_radius and shockwave_active: shockwave_active = False
-
-        # --- Drawing ---
-        if game_state in ["PLAYING", "BOSS_FIGHT", "BOSS_WARNING"]:
-            pygame.draw.rect(screen, WHITE, snake_rect)
-            if game_state in ["PLAYING", "BOSS_WARNING"]:
-                if apple_rect: pygame.draw.circle(screen, GREEN, apple_rect.center, snake_block // 2)
-                if blue_item_rect: pygame.draw.circle(screen, BLUE, blue_item_rect.center, snake_block // 2)
-                for bomb_r in bombs: pygame.draw.rect(screen, RED, bomb_r)
-                for enemy in enemies: pygame.draw.rect(screen, YELLOW, enemy['rect'])
-            if game_state == "BOSS_WARNING":
-                if int(current_time * 2) % 2 == 0: 
-                    message("WARNING!", RED, WIDTH // 2, HEIGHT // 2 - 50, font_xlarge, center_x=True, center_y=True)
-                    message("BOSS INCOMING!", RED, WIDTH // 2, HEIGHT // 2 + 50, font_large, center_x=True, center_y=True)
-            if game_state == "BOSS_FIGHT" and boss_rect:
-                boss_color = DARK_RED if boss_rage_mode_active else PURPLE
-                pygame.draw.rect(screen, boss_color, boss_rect)
-                hbw, hbh = 200, 20; chw = max(0, (boss_health / boss_max_health) * hbw)
-                pygame.draw.rect(screen, RED, [WIDTH // 2 - hbw // 2, 30, hbw, hbh])
-                pygame.draw.rect(screen, ORANGE, [WIDTH // 2 - hbw // 2, 30, chw, hbh])
-                message("BOSS", WHITE, WIDTH//2, 10, font_small, center_x=True)
-            for d_info in darts: draw_triangle_dart(screen, GRAY, d_info['rect'], d_info['visual_direction_str'])
-            if shockwave_active: pygame.draw.circle(screen, BLUE, snake_rect.center, int(shockwave_radius), 3)
-            message(f"Score: {score}", WHITE, 10, 10); message(f"Shockwave: {shockwave_charges}", WHITE, 10, 40); message(f"Darts: {num_darts_per_shot}", WHITE, 10, 70)
-            ccp = (current_time - last_dart_time) / dart_cooldown; dbw = 100 * min(1, ccp if not dart_ready else 1)
-            bar_col = GREEN if dart_ready else RED
-            pygame.draw.rect(screen, bar_col, [10, HEIGHT - 30, dbw, 10]); pygame.draw.rect(screen, WHITE, [10, HEIGHT - 30, 100, 10], 2)
-            message("Dart CD", WHITE, 120, HEIGHT - 35)
-        
         elif game_state == "GAME_OVER" or game_state == "VICTORY":
+            screen.fill(BLACK)
             # Stop any game/boss music first
-            pygame.mixer.music.stop() 
+            stop_music()
 
             msg_txt = "Game Over!" if game_state == "GAME_OVER" else "VICTORY!"
             msg_col = RED if game_state == "GAME_OVER" else GREEN
             
-            if game_state == "VICTORY":
-                try:
-                    # Using a Sound object for victory sfx as music channel is tricky here
-                    victory_sfx = pygame.mixer.Sound("victory.mp3")
-                    victory_sfx.play() 
-                except pygame.error as e:
-                    print(f"Could not load or play victory.mp3 as SFX: {e}")
+            if game_state == "VICTORY": play_sound('victory') # Preloaded; an effect so it overlaps the music fade
 
             message(msg_txt, msg_col, WIDTH // 2, HEIGHT // 2 - 80, font_large, center_x=True, center_y=True)
-            message(f"Final Score: {score}", WHITE, WIDTH // 2, HEIGHT // 2, font_medium, center_x=True, center_y=True)
+            message(f"Final Score: {sim.score}", WHITE, WIDTH // 2, HEIGHT // 2, font_medium, center_x=True, center_y=True)
             message("Play Again? (Y/N)", YELLOW, WIDTH // 2, HEIGHT // 2 + 80, font_medium, center_x=True, center_y=True)
             running_game_logic = False
 
-        pygame.display.update()
+        if update_rects is None: pygame.display.update()
+        else: pygame.display.update(update_rects)
+        if prof: prof.mark('display update')
+        if 'first frame' not in startup_times:
+            startup_times['first frame'] = time.perf_counter() - _import_start
+            if show_startup_times: report_startup_times()
         clock.tick(game_speed)
+        if prof:
+            prof.mark('clock tick (sleep)')
+            turn_stats = {'turn_latency_ms': round(sim.turn_latencies[-1] * 1000, 1)} if sim.turns_applied != turns_applied else {}
+            prof.end_frame(state=game_state, ticks=ticks_run, enemies=sim.enemy_count, darts=len(sim.darts), bombs=len(sim.bombs),
+                           turns_dropped=sim.turns_dropped, **turn_stats)
+
+    if recorder: recorder.save(record_path, sim)
 
     # This stop is mainly for if the game loop exits unexpectedly (e.g. direct quit during gameplay)
     # For GAME_OVER/VICTORY, music is handled above or in the input loop.
     if game_state not in ["GAME_OVER", "VICTORY"]: # Only stop if not already handled by end screens
-         pygame.mixer.music.stop()
+         stop_music()
 
 
     if game_state == "GAME_OVER" or game_state == "VICTORY":
@@ -447,32 +412,34 @@ def game_loop():
     return "QUIT" 
 
 if __name__ == '__main__':
-    current_music_file = "bgm.mp3"
+    horde_mode = '--horde' in sys.argv # NumPy swarm enemies with uncapped wave growth
+    full_redraw = '--full-redraw' in sys.argv # Disable dirty-rect updates
+    show_startup_times = '--startup-times' in sys.argv
+    # --record FILE saves each round's inputs (FILE, FILE.2, ...) for replay.py
+    record_file = sys.argv[sys.argv.index('--record') + 1] if '--record' in sys.argv else None
+    turn_buffer = 0 if '--no-turn-buffer' in sys.argv else TURN_BUFFER_SIZE # 0 = latest turn before a move wins
+    immediate_turns = '--immediate-turns' in sys.argv # A turn moves the snake on the next tick instead of waiting out the interval
+    # --world WxH plays in a scrolling world of that size, e.g. 20000x20000
+    world_size = tuple(int(v) for v in sys.argv[sys.argv.index('--world') + 1].split('x')) if '--world' in sys.argv else None
+    flow_field = '--direct-chase' not in sys.argv # Enemies head straight for the snake instead of pathing around bombs
+    rounds = 0
+    startup_times['imports'] = time.perf_counter() - _import_start
+    init_game()
     while True:
-        try:
-            pygame.mixer.music.load(current_music_file)
-            pygame.mixer.music.play(-1)
-        except pygame.error as e:
-            print(f"Error loading/playing music {current_music_file}: {e}")
-            # Optionally, try to load a fallback or proceed without music
-            if current_music_file != "bgm.mp3": # If boss music failed, try default
-                try:
-                    current_music_file = "bgm.mp3"
-                    pygame.mixer.music.load(current_music_file)
-                    pygame.mixer.music.play(-1)
-                except pygame.error:
-                    print("Could not load default BGM either.")
-
-
-        action = game_loop() 
-        
+        play_music("bgm.mp3")
+        rounds += 1
+        record_path = record_file and (record_file if rounds == 1 else f"{record_file}.{rounds}")
+        action = game_loop(swarm=horde_mode, dirty_rects=not full_redraw, record_path=record_path,
+                           turn_buffer=turn_buffer, immediate_turns=immediate_turns, world_size=world_size,
+                           flow_field=flow_field)
+
         # Music is stopped inside game_loop before it returns for GAME_OVER/VICTORY,
         # or at the very end of game_loop if it's a direct quit.
 
         if action == "QUIT":
             break
         elif action == "PLAY_AGAIN":
-            current_music_file = "bgm.mp3" 
-            # The loop will reload and play bgm.mp3 at the start of the next iteration
+            # The loop will play bgm.mp3 again at the start of the next iteration
             continue 
-    pygame.quit()
\ No newline at end of file
+    profiler.close() # Flushes the HUNGRY_SNAKE_PROFILE_LOG stream
+    pygame.quit()
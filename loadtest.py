@@ -0,0 +1,113 @@
+"""Load test for server.py: hundreds of simulated clients on one event loop.
+
+    python server.py --bot greedy --wave 200 &
+    python loadtest.py --clients 300 --seconds 30 [--decode 10] [--input-every 30]
+
+Each connection reads every message the server sends. The first --decode of
+them also run a SnapshotMirror over the stream, as a real client would, so
+a malformed delta fails loudly; the rest only count bytes, which keeps the
+load generator from becoming the bottleneck. With --input-every each client
+also sends a random input every that many ticks' worth of time.
+
+Prints per-client bandwidth, snapshot rate and resyncs, and the server's own
+tick times from its stats messages.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from netcode import SnapshotMirror, KEYFRAME, DELTA, STATS, WELCOME, read_message, encode_input
+from server import DEFAULT_PORT
+from sim import DIRECTIONS, Inputs, SIM_DT
+
+class ClientStats:
+    __slots__ = ('bytes', 'snapshots', 'keyframes', 'connected', 'error')
+
+    def __init__(self):
+        self.bytes = self.snapshots = self.keyframes = 0
+        self.connected, self.error = False, None
+
+async def send_inputs(writer, every, rng):
+    directions = list(DIRECTIONS)
+    while True:
+        await asyncio.sleep(every * SIM_DT * rng.uniform(0.5, 1.5))
+        writer.write(encode_input(Inputs(rng.choice(directions), rng.random() < 0.3, rng.random() < 0.02)))
+
+async def run_client(host, port, stats, decode, input_every, seed, stop_at, server_reports):
+    loop = asyncio.get_running_loop()
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError as e:
+        stats.error = str(e); return
+    stats.connected = True
+    sender = asyncio.create_task(send_inputs(writer, input_every, random.Random(seed))) if input_every else None
+    mirror = None
+    try:
+        while loop.time() < stop_at:
+            payload = await read_message(reader)
+            if payload is None: stats.error = "disconnected"; break
+            stats.bytes += len(payload) + 4
+            kind = payload[:1]
+            if kind in (KEYFRAME, DELTA):
+                stats.snapshots += 1
+                if kind == KEYFRAME: stats.keyframes += 1
+                if mirror is not None: mirror.receive(payload); mirror.catch_up(); mirror.update_view()
+            elif kind == WELCOME and decode:
+                welcome = json.loads(payload[1:])
+                mirror = SnapshotMirror(*welcome['world'], welcome['snapshot_every'])
+            elif kind == STATS and server_reports is not None:
+                server_reports.append(json.loads(payload[1:]))
+    finally:
+        if sender: sender.cancel()
+        writer.close()
+
+async def run(args):
+    loop = asyncio.get_running_loop()
+    clients = [ClientStats() for _ in range(args.clients)]
+    server_reports = []
+    start = loop.time()
+    stop_at = start + args.ramp + args.seconds
+    tasks = []
+    for i, stats in enumerate(clients):
+        tasks.append(asyncio.create_task(run_client(args.host, args.port, stats, i < args.decode, args.input_every, i, stop_at,
+                                                    server_reports if i == 0 else None)))
+        await asyncio.sleep(args.ramp / args.clients) # Spread the connects out
+    # Measure the steady part only: zero the counters once everyone is in
+    await asyncio.sleep(max(0.0, start + args.ramp - loop.time()))
+    for stats in clients: stats.bytes = stats.snapshots = stats.keyframes = 0
+    del server_reports[:]
+    measure_start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - measure_start
+
+    connected = [c for c in clients if c.connected]
+    errors = [c.error for c in clients if c.error]
+    rates = sorted(c.bytes / elapsed / 1024 for c in connected)
+    print(f"{len(connected)}/{args.clients} clients connected, {len(errors)} errors{': ' + errors[0] if errors else ''}")
+    if rates:
+        print(f"per client: {statistics.fmean(rates):.1f} KiB/s mean, {rates[-1]:.1f} KiB/s max, "
+              f"{statistics.fmean(c.snapshots for c in connected) / elapsed:.1f} snapshots/s, "
+              f"{sum(c.keyframes for c in connected)} resync keyframes")
+    if server_reports:
+        p50 = statistics.fmean(r['tick_ms_p50'] for r in server_reports)
+        p99 = max(r['tick_ms_p99'] for r in server_reports)
+        print(f"server: tick p50 {p50:.2f} ms, worst p99 {p99:.2f} ms, max {max(r['tick_ms_max'] for r in server_reports):.2f} ms, "
+              f"snapshot {statistics.fmean(r['snapshot_bytes_mean'] for r in server_reports):.0f} B mean, "
+              f"{statistics.fmean(r['enemies'] for r in server_reports):.0f} enemies, {sum(r['skipped'] for r in server_reports)} skipped sends")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate many clients against server.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=20, help="measured time after every client has connected")
+    parser.add_argument('--ramp', type=float, default=5, help="seconds over which clients connect")
+    parser.add_argument('--decode', type=int, default=5, metavar='N', help="clients that decode and interpolate every snapshot")
+    parser.add_argument('--input-every', type=int, default=0, metavar='TICKS', help="send a random input about this often (0 = spectate)")
+    asyncio.run(run(parser.parse_args(argv)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Window client for server.py: sends this player's inputs, draws the server's game.
+
+    python netclient.py [--host 127.0.0.1] [--port 7777] [--spectate]
+
+Nothing is simulated here. Snapshots feed a SnapshotMirror whose interpolated
+view goes through the same draw_sim as local play, a couple of snapshots
+behind the newest so there is always one to glide toward.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import pygame
+
+import game
+from netcode import SnapshotMirror, KEYFRAME, DELTA, STATS, WELCOME, read_message, encode_input
+from server import DEFAULT_PORT
+from sim import SIM_DT, WIDTH, HEIGHT, game_speed
+
+MUSIC = {"PLAYING": "bgm.mp3", "BOSS_WARNING": "bgm.mp3", "BOSS_FIGHT": "boss.mp3"}
+
+async def play(host, port, spectate):
+    game.init_game()
+    reader, writer = await asyncio.open_connection(host, port)
+    payload = await read_message(reader)
+    if payload is None or payload[:1] != WELCOME: raise SystemExit(f"{host}:{port} did not greet us as a game server")
+    welcome = json.loads(payload[1:])
+    mirror = SnapshotMirror(*welcome['world'], welcome['snapshot_every'])
+    server_stats = {}
+
+    async def receive():
+        while True:
+            payload = await read_message(reader)
+            if payload is None: return
+            kind = payload[:1]
+            if kind in (KEYFRAME, DELTA): mirror.receive(payload)
+            elif kind == STATS: server_stats.update(json.loads(payload[1:]))
+
+    receiver = asyncio.create_task(receive())
+    last, music_state = time.perf_counter(), None
+    try:
+        while not receiver.done():
+            frame_start = time.perf_counter()
+            presses = game.read_inputs(pygame.event.get())
+            if presses is None: break
+            if not spectate:
+                for pressed in presses: writer.write(encode_input(pressed))
+            mirror.advance((frame_start - last) / SIM_DT); last = frame_start
+            view = mirror.update_view()
+
+            if MUSIC.get(view.game_state) != music_state:
+                music_state = MUSIC.get(view.game_state)
+                if music_state: game.play_music(music_state)
+                else: game.stop_music()
+            game.screen.fill(game.BLACK)
+            if view.game_state in ("GAME_OVER", "VICTORY"):
+                won = view.game_state == "VICTORY"
+                game.message("VICTORY!" if won else "Game Over!", game.GREEN if won else game.RED, WIDTH // 2, HEIGHT // 2 - 80,
+                             game.font_large, center_x=True, center_y=True)
+                game.message(f"Final Score: {view.score}", game.WHITE, WIDTH // 2, HEIGHT // 2, game.font_medium, center_x=True, center_y=True)
+                game.message("Next game starting...", game.YELLOW, WIDTH // 2, HEIGHT // 2 + 80, game.font_medium, center_x=True, center_y=True)
+            elif 'snake' in mirror.blocks:
+                game.draw_sim(view)
+            if server_stats:
+                game.message(f"{server_stats['clients']} connected  {server_stats['client_kib_per_s']:.1f} KiB/s", game.GRAY, WIDTH - 220,
+                             HEIGHT - 25, game.font_tiny)
+            pygame.display.update()
+            await asyncio.sleep(max(0.0, 1 / game_speed - (time.perf_counter() - frame_start)))
+    finally:
+        receiver.cancel()
+        writer.close()
+        game.stop_music()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Join a game hosted by server.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--spectate', action='store_true', help="watch without sending inputs")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(play(args.host, args.port, args.spectate))
+    except ConnectionRefusedError:
+        raise SystemExit(f"No server at {args.host}:{args.port}")
+    pygame.quit()
+
+if __name__ == '__main__':
+    main()
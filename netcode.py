@@ -0,0 +1,357 @@
+"""Wire format for networked play: framing, inputs and delta-compressed snapshots.
+
+Every message is a little-endian uint32 byte count and then the payload, whose
+first byte says what it is:
+
+    W  welcome (server -> client): JSON with the world size and snapshot rate
+    K  keyframe: the complete state, sent on join or after a client fell behind
+    D  delta: only what changed since the previous K or D
+    S  server stats (JSON), about once a second
+    I  input (client -> server): direction code and fire/shockwave flags
+
+A snapshot (K or D) is the tick, a bitmask of the global blocks that follow
+(snake, status, items, boss, shockwave; each only if its bytes changed), then
+for enemies, bombs and darts in turn: ids removed, entities added or jumped
+(id, x, y, extra byte) and entities nudged (id, dx, dy as int8). Positions go
+over the wire in QUANTUM-pixel units. Entities get small per-kind ids that
+are recycled once the removal has been sent.
+
+    python netcode.py       # encode/decode round trip on the bench scenarios, with bytes per snapshot
+"""
+import json
+import struct
+from collections import deque, namedtuple
+
+import pygame
+
+from sim import DIRECTIONS, Inputs, SIM_DT, WIDTH, HEIGHT, camera_view, snake_block
+
+QUANTUM = 2 # Pixels per position unit on the wire
+TELEPORT = 100 # Pixels; a bigger move between snapshots snaps instead of gliding (darts are reused, the snake respawns)
+MAX_MESSAGE = 1 << 22
+INTEREST_MARGIN = 40 # Pixels past the camera view that big-world snapshots still cover
+
+WELCOME, KEYFRAME, DELTA, STATS, INPUT = b'W', b'K', b'D', b'S', b'I'
+KINDS = ('enemy', 'bomb', 'dart')
+STATES = ("PLAYING", "BOSS_WARNING", "BOSS_FIGHT", "GAME_OVER", "VICTORY")
+DIRECTION_CODES = (None,) + tuple(DIRECTIONS)
+
+FRAME = struct.Struct('<I')
+HEADER = struct.Struct('<cIB') # type, tick, global block mask
+COUNT = struct.Struct('<H')
+UPSERT = struct.Struct('<HHHB') # id, x, y, extra
+MOVE = struct.Struct('<Hbb') # id, dx, dy
+INPUT_MESSAGE = struct.Struct('<cBB') # 'I', direction code, fire | shockwave << 1
+
+# Global blocks in mask-bit order: name, layout
+BLOCKS = (
+    ('snake', struct.Struct('<HHB')), # x, y, size
+    ('status', struct.Struct('<BIBBB')), # state, score, shockwave charges, darts per shot, dart charge 0-255
+    ('items', struct.Struct('<BHHBHH')), # apple present, x, y, blue item present, x, y
+    ('boss', struct.Struct('<BHHBHHB')), # present, x, y, size, health, max health, rage
+    ('shockwave', struct.Struct('<BH')), # active, radius
+)
+
+def frame(payload):
+    return FRAME.pack(len(payload)) + payload
+
+async def read_message(reader):
+    """Next payload from an asyncio StreamReader, or None once the peer has gone."""
+    try:
+        size, = FRAME.unpack(await reader.readexactly(FRAME.size))
+        if size > MAX_MESSAGE: raise ValueError(f"message of {size} bytes")
+        return await reader.readexactly(size)
+    except (EOFError, ConnectionError, OSError):
+        return None
+
+def encode_input(inputs):
+    return frame(INPUT_MESSAGE.pack(INPUT, DIRECTION_CODES.index(inputs.direction), inputs.fire | inputs.shockwave << 1))
+
+def decode_input(payload):
+    """Inputs from a client's INPUT payload; ValueError if it is malformed."""
+    if len(payload) != INPUT_MESSAGE.size: raise ValueError(f"input message of {len(payload)} bytes, expected {INPUT_MESSAGE.size}")
+    _, direction, flags = INPUT_MESSAGE.unpack(payload)
+    if direction >= len(DIRECTION_CODES): raise ValueError(f"bad direction code {direction}")
+    return Inputs(DIRECTION_CODES[direction], bool(flags & 1), bool(flags & 2))
+
+def encode_json(kind, data):
+    return frame(kind + json.dumps(data).encode())
+
+def _q(value):
+    # Wire positions are unsigned; anything left of or above the world is pinned to its edge
+    return min(max(value, 0) // QUANTUM, 0xFFFF)
+
+class SnapshotEncoder:
+    """Server side: turns a GameSim into snapshot messages.
+
+    Remembers what clients were last told (quantised position and extra byte
+    of every entity, and each global block's bytes) so `delta` carries only
+    changes. All synced clients share the one delta stream: TCP delivers
+    every message in order, so each client's baseline is the previous
+    message. `keyframe` restates that baseline in full for clients that
+    join or have to skip ahead.
+    """
+
+    def __init__(self):
+        self.tick = 0
+        self._tracked = {kind: {} for kind in KINDS} # id(obj) -> [obj, net id, x, y, extra]; holding obj keeps its id() unique
+        self._free_ids = {kind: [] for kind in KINDS}
+        self._next_id = dict.fromkeys(KINDS, 0)
+        self._blocks = [b''] * len(BLOCKS)
+
+    def _entities(self, sim, area):
+        return {
+            'enemy': ((r, r, 0) for r in sim.enemy_rects(area) if area is None or area.colliderect(r)), # Chunk queries overreach
+            'bomb': ((r, r, 0) for r in sim.bomb_rects(area)),
+            'dart': ((d, d.rect, DIRECTION_CODES.index(d.visual_direction_str)) for d in sim.darts
+                     if area is None or area.colliderect(d.rect)),
+        }
+
+    def _global_blocks(self, sim):
+        snake, apple, blue, boss = sim.snake_rect, sim.apple_rect, sim.blue_item_rect, sim.boss_rect
+        dart_charge = 255 if sim.dart_ready else min(254, int(255 * (sim.time - sim.last_dart_time) / sim.dart_cooldown))
+        return (
+            BLOCKS[0][1].pack(_q(snake.x), _q(snake.y), int(snake.w)),
+            BLOCKS[1][1].pack(STATES.index(sim.game_state), sim.score, min(sim.shockwave_charges, 255), sim.num_darts_per_shot, dart_charge),
+            BLOCKS[2][1].pack(bool(apple), _q(apple.x) if apple else 0, _q(apple.y) if apple else 0,
+                              bool(blue), _q(blue.x) if blue else 0, _q(blue.y) if blue else 0),
+            BLOCKS[3][1].pack(bool(boss), _q(boss.x) if boss else 0, _q(boss.y) if boss else 0, boss.w if boss else 0,
+                              max(sim.boss_health, 0), sim.boss_max_health, sim.boss_rage_mode_active),
+            BLOCKS[4][1].pack(sim.shockwave_active, int(sim.shockwave_radius)),
+        )
+
+    def delta(self, sim, tick=None):
+        """Framed D message for the sim's current state; advances the baseline to it.
+
+        `tick` stamps the snapshot (default the sim's tick); it must keep
+        counting up across games for clients' interpolation clocks.
+        """
+        self.tick = sim.tick_count if tick is None else tick
+        area = sim.camera_rect().inflate(2 * INTEREST_MARGIN, 2 * INTEREST_MARGIN) if sim.large_world else None
+        mask, parts = 0, []
+        for bit, block in enumerate(self._global_blocks(sim)):
+            if block != self._blocks[bit]: mask |= 1 << bit; parts.append(block); self._blocks[bit] = block
+        for kind, items in self._entities(sim, area).items(): parts.append(self._delta_kind(kind, items))
+        return frame(HEADER.pack(DELTA, self.tick, mask) + b''.join(parts))
+
+    def _delta_kind(self, kind, items):
+        tracked, seen = self._tracked[kind], {}
+        upserts, moves = [], []
+        for obj, rect, extra in items:
+            x, y = _q(rect.x), _q(rect.y)
+            entry = tracked.pop(id(obj), None)
+            if entry is None:
+                free = self._free_ids[kind]
+                if free: net_id = free.pop()
+                else: net_id = self._next_id[kind]; self._next_id[kind] += 1
+                entry = [obj, net_id, x, y, extra]
+                upserts.append(UPSERT.pack(net_id, x, y, extra))
+            elif x != entry[2] or y != entry[3] or extra != entry[4]:
+                dx, dy = x - entry[2], y - entry[3]
+                if extra == entry[4] and -128 <= dx <= 127 and -128 <= dy <= 127: moves.append(MOVE.pack(entry[1], dx, dy))
+                else: upserts.append(UPSERT.pack(entry[1], x, y, extra))
+                entry[2], entry[3], entry[4] = x, y, extra
+            seen[id(obj)] = entry
+        removed = [entry[1] for entry in tracked.values()]
+        self._free_ids[kind].extend(removed)
+        self._tracked[kind] = seen
+        return b''.join((COUNT.pack(len(removed)), struct.pack(f'<{len(removed)}H', *removed),
+                         COUNT.pack(len(upserts)), *upserts, COUNT.pack(len(moves)), *moves))
+
+    def keyframe(self):
+        """Framed K message restating the baseline the last delta left."""
+        parts = list(self._blocks)
+        for kind in KINDS:
+            entries = self._tracked[kind].values()
+            parts += [COUNT.pack(0), COUNT.pack(len(entries))]
+            parts += [UPSERT.pack(net_id, x, y, extra) for _, net_id, x, y, extra in entries]
+            parts.append(COUNT.pack(0))
+        return frame(HEADER.pack(KEYFRAME, self.tick, (1 << len(BLOCKS)) - 1) + b''.join(parts))
+
+
+RemoteDart = namedtuple('RemoteDart', 'rect visual_direction_str')
+
+class RemoteView:
+    """What game.draw_sim reads from a GameSim, filled in from a SnapshotMirror."""
+
+    def __init__(self, world_w, world_h):
+        self.world_rect = pygame.Rect(0, 0, world_w, world_h)
+        self.large_world = world_w > WIDTH or world_h > HEIGHT
+        self.time, self.game_state, self.score = 0.0, "PLAYING", 0
+        self.snake_rect = pygame.Rect(0, 0, 0, 0)
+        self.apple_rect = self.blue_item_rect = self.boss_rect = None
+        self.enemies, self.bombs, self.darts = [], [], []
+        self.boss_health = self.boss_max_health = 1
+        self.boss_rage_mode_active = self.shockwave_active = False
+        self.shockwave_radius = self.shockwave_charges = 0
+        self.num_darts_per_shot, self.dart_ready = 1, True
+        self.last_dart_time, self.dart_cooldown = 0.0, 1.0
+
+    def camera_rect(self):
+        return camera_view(self.snake_rect.center, self.world_rect)
+
+    def enemy_rects(self, area=None):
+        return self.enemies
+
+    def bomb_rects(self, area=None):
+        return self.bombs
+
+
+class SnapshotMirror:
+    """Client side: the world as the server last described it, interpolated for drawing.
+
+    Snapshots queue as they arrive and are applied as a render clock, running
+    `delay` ticks behind the newest one, reaches them. Between two applied
+    snapshots every entity that moved is drawn part-way from its old
+    position to its new one, so motion stays smooth at a snapshot rate below
+    the frame rate and across uneven arrival.
+    """
+
+    def __init__(self, world_w, world_h, snapshot_every):
+        self.view = RemoteView(world_w, world_h)
+        self.delay = 2 * snapshot_every
+        self.entities = {kind: {} for kind in KINDS} # net id -> [from x, from y, x, y, extra, seq it moved in]
+        self.blocks = {}
+        self.snake_from = self.boss_from = None
+        self.pending = deque() # (tick, payload)
+        self.from_tick = self.to_tick = self.render_tick = None
+        self.seq = 0
+        self.snapshots = self.keyframes = 0
+
+    def receive(self, payload):
+        kind, tick, _ = HEADER.unpack_from(payload)
+        if kind == KEYFRAME: self.pending.clear(); self.keyframes += 1
+        self.pending.append((tick, payload))
+        self.snapshots += 1
+
+    def advance(self, ticks):
+        """Move the render clock on by `ticks` (fractional) and apply the snapshots it has reached."""
+        if not self.pending and self.to_tick is None: return
+        latest = self.pending[-1][0] if self.pending else self.to_tick
+        target = latest - self.delay
+        if self.render_tick is None or abs(self.render_tick + ticks - target) > 2 * self.delay: self.render_tick = target
+        else: self.render_tick += ticks + 0.05 * (target - self.render_tick - ticks) # Ease toward the target lag
+        while self.pending and (self.to_tick is None or self.pending[0][1][:1] == KEYFRAME or self.render_tick >= self.to_tick):
+            self._apply(self.pending.popleft()[1])
+
+    def catch_up(self):
+        """Apply everything received, without interpolation (load tests, checks)."""
+        while self.pending: self._apply(self.pending.popleft()[1])
+        self.render_tick = self.to_tick
+
+    def _apply(self, payload):
+        kind, tick, mask = HEADER.unpack_from(payload)
+        offset = HEADER.size
+        keyframe = kind == KEYFRAME
+        if keyframe:
+            for entities in self.entities.values(): entities.clear()
+        self.from_tick, self.to_tick = (tick if keyframe or self.to_tick is None else self.to_tick), tick
+        self.seq += 1
+        old_snake, old_boss = self.blocks.get('snake'), self.blocks.get('boss')
+        for bit, (name, layout) in enumerate(BLOCKS):
+            if mask & 1 << bit: self.blocks[name] = layout.unpack_from(payload, offset); offset += layout.size
+        # The snake and boss glide like entities; remember where they were drawn from
+        self.snake_from = None if keyframe or old_snake is None else old_snake
+        self.boss_from = None if keyframe or old_boss is None or not old_boss[0] else old_boss
+        seq = self.seq
+        for kind in KINDS:
+            entities = self.entities[kind]
+            count, = COUNT.unpack_from(payload, offset); offset += COUNT.size
+            for net_id in struct.unpack_from(f'<{count}H', payload, offset): entities.pop(net_id, None)
+            offset += 2 * count
+            count, = COUNT.unpack_from(payload, offset); offset += COUNT.size
+            for _ in range(count):
+                net_id, x, y, extra = UPSERT.unpack_from(payload, offset); offset += UPSERT.size
+                x, y = x * QUANTUM, y * QUANTUM
+                old = entities.get(net_id)
+                if old is None or keyframe or extra != old[4]: entities[net_id] = [x, y, x, y, extra, seq]
+                else: entities[net_id] = [old[2], old[3], x, y, extra, seq]
+            count, = COUNT.unpack_from(payload, offset); offset += COUNT.size
+            for _ in range(count):
+                net_id, dx, dy = MOVE.unpack_from(payload, offset); offset += MOVE.size
+                entry = entities[net_id]
+                entry[0], entry[1], entry[5] = entry[2], entry[3], seq
+                entry[2] += dx * QUANTUM; entry[3] += dy * QUANTUM
+
+    def _alpha(self):
+        if self.render_tick is None or self.to_tick == self.from_tick: return 1.0
+        return min(1.0, max(0.0, (self.render_tick - self.from_tick) / (self.to_tick - self.from_tick)))
+
+    def update_view(self):
+        """Fill `view` with the interpolated state at the render clock; returns it."""
+        view, blocks = self.view, self.blocks
+        if 'snake' not in blocks: return view
+        alpha, seq = self._alpha(), self.seq
+
+        def lerp(x0, y0, x1, y1):
+            if abs(x1 - x0) > TELEPORT or abs(y1 - y0) > TELEPORT: return x1, y1
+            return round(x0 + (x1 - x0) * alpha), round(y0 + (y1 - y0) * alpha)
+
+        def place(entry):
+            if entry[5] != seq: return entry[2], entry[3]
+            return lerp(*entry[:4])
+
+        x, y, size = blocks['snake']
+        if self.snake_from: x0, y0 = self.snake_from[0] * QUANTUM, self.snake_from[1] * QUANTUM; x, y = lerp(x0, y0, x * QUANTUM, y * QUANTUM)
+        else: x, y = x * QUANTUM, y * QUANTUM
+        view.snake_rect = pygame.Rect(x, y, size, size)
+        state, view.score, view.shockwave_charges, view.num_darts_per_shot, dart_charge = blocks['status']
+        view.game_state = STATES[state]
+        view.time = (self.render_tick or 0) * SIM_DT
+        view.dart_ready = dart_charge == 255
+        view.last_dart_time = view.time - dart_charge / 255 * view.dart_cooldown
+        apple, ax, ay, blue, bx, by = blocks['items']
+        view.apple_rect = pygame.Rect(ax * QUANTUM, ay * QUANTUM, snake_block, snake_block) if apple else None
+        view.blue_item_rect = pygame.Rect(bx * QUANTUM, by * QUANTUM, snake_block, snake_block) if blue else None
+        present, bx, by, size, view.boss_health, view.boss_max_health, rage = blocks['boss']
+        if present:
+            bx, by = bx * QUANTUM, by * QUANTUM
+            if self.boss_from: bx, by = lerp(self.boss_from[1] * QUANTUM, self.boss_from[2] * QUANTUM, bx, by)
+            view.boss_rect = pygame.Rect(bx, by, size, size)
+        else:
+            view.boss_rect = None
+        view.boss_rage_mode_active = bool(rage)
+        view.shockwave_active, view.shockwave_radius = bool(blocks['shockwave'][0]), blocks['shockwave'][1]
+        view.enemies = [pygame.Rect(*place(e), snake_block, snake_block) for e in self.entities['enemy'].values()]
+        view.bombs = [pygame.Rect(e[2], e[3], snake_block, snake_block) for e in self.entities['bomb'].values()]
+        view.darts = [RemoteDart(pygame.Rect(*place(e), snake_block, snake_block), DIRECTION_CODES[e[4]]) for e in self.entities['dart'].values()]
+        return view
+
+
+if __name__ == '__main__':
+    # Round trip: benchmark scenarios through the encoder and a mirror, checking the mirror matches the sim
+    import time
+
+    import scenarios
+    from sim import GameSim
+
+    def check(sim, mirror):
+        view = mirror.update_view()
+        quantised = lambda rects: sorted((r.x // QUANTUM * QUANTUM, r.y // QUANTUM * QUANTUM) for r in rects)
+        area = sim.camera_rect().inflate(2 * INTEREST_MARGIN, 2 * INTEREST_MARGIN) if sim.large_world else None
+        assert quantised(view.enemies) == quantised(r for r in sim.enemy_rects(area) if area is None or area.colliderect(r)), "enemies differ"
+        assert quantised(view.bombs) == quantised(sim.bomb_rects(area)), "bombs differ"
+        assert view.snake_rect.topleft == (sim.snake_rect.x // QUANTUM * QUANTUM, sim.snake_rect.y // QUANTUM * QUANTUM), "snake differs"
+        assert view.score == sim.score and view.game_state == sim.game_state
+
+    for name in ('max_bombs', 'dart_spam', 'large_wave_flow', 'boss_fight', 'large_world'):
+        setup, policy, options = scenarios.SCENARIOS[name]
+        sizes, keyframe_sizes, encode_time = [], [], 0.0
+        for seed in range(3):
+            sim = GameSim(seed, **options); setup(sim)
+            encoder, mirror = SnapshotEncoder(), SnapshotMirror(sim.world_w, sim.world_h, 2)
+            for tick in range(1200):
+                if not sim.is_active: break
+                sim.tick(policy(sim, tick))
+                if tick % 2: continue
+                start = time.perf_counter(); message = encoder.delta(sim); encode_time += time.perf_counter() - start
+                sizes.append(len(message))
+                mirror.receive(message[FRAME.size:]); mirror.catch_up(); check(sim, mirror)
+                if tick % 300 == 0:
+                    # A late joiner's keyframe must rebuild the same state
+                    keyframe = encoder.keyframe(); keyframe_sizes.append(len(keyframe))
+                    joiner = SnapshotMirror(sim.world_w, sim.world_h, 2); joiner.receive(keyframe[FRAME.size:]); joiner.catch_up(); check(sim, joiner)
+        sizes.sort()
+        print(f"{name:>15}: {len(sizes):5} snapshots, delta bytes mean {sum(sizes) / len(sizes):6.0f} p99 {sizes[int(0.99 * len(sizes))]:6} "
+              f"max {sizes[-1]:6}, keyframe mean {sum(keyframe_sizes) / len(keyframe_sizes):6.0f}, "
+              f"encode {encode_time / len(sizes) * 1e6:5.0f} us, {sum(sizes) / len(sizes) * 30 / 1024:5.1f} KiB/s at 30 Hz")
@@ -0,0 +1,96 @@
+import json
+import os
+import time
+from collections import deque
+
+import pygame
+
+PROFILE_ENV = 'HUNGRY_SNAKE_PROFILE' # Set to 1 to start with the profiler on (F3 toggles it in game)
+PROFILE_LOG_ENV = 'HUNGRY_SNAKE_PROFILE_LOG' # JSONL file to stream per-frame records to
+
+class FrameProfiler:
+    """Lap-style per-phase frame timer.
+
+    `mark(phase)` charges the time since the previous mark to `phase`, so a
+    frame is timed by dropping marks at section boundaries. Marks made by the
+    simulation during a multi-tick step add up into the same phases. Callers
+    check `enabled` (or hold None) before marking, so a disabled profiler
+    costs one attribute test per section.
+    """
+
+    def __init__(self, enabled=False, log_path=None, history=240):
+        self.enabled = enabled
+        self.frame_index = 0
+        self.phases = {}
+        self.frame_ms = deque(maxlen=history)
+        self.last_phases = {}
+        self._extra_text = {} # Numeric extras for the overlay; the last value seen is kept until it next changes
+        self._last = self._frame_start = time.perf_counter()
+        self._log = open(log_path, 'a') if log_path else None
+        self._text_lines, self._text_frame = [], -1
+
+    @classmethod
+    def from_env(cls):
+        return cls(enabled=os.environ.get(PROFILE_ENV, '') not in ('', '0'), log_path=os.environ.get(PROFILE_LOG_ENV) or None)
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.begin_frame()
+
+    def begin_frame(self):
+        self.phases = {}
+        self._last = self._frame_start = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self._last)
+        self._last = now
+
+    def end_frame(self, **extra):
+        """Close the frame, stream it to the log and start timing the next one."""
+        now = time.perf_counter()
+        total_ms = (now - self._frame_start) * 1000
+        self.frame_ms.append(total_ms)
+        self.last_phases = {phase: seconds * 1000 for phase, seconds in self.phases.items()}
+        self._extra_text.update((key, value) for key, value in extra.items() if isinstance(value, (int, float)))
+        if self._log:
+            record = {'frame': self.frame_index, 'total_ms': round(total_ms, 4),
+                      'phases': {phase: round(ms, 4) for phase, ms in self.last_phases.items()}}
+            record.update(extra)
+            self._log.write(json.dumps(record) + '\n')
+        self.frame_index += 1
+        self.phases = {}
+        self._last = self._frame_start = now
+
+    def close(self):
+        if self._log: self._log.close(); self._log = None
+
+    # --- Overlay ---
+    def draw_overlay(self, surface, font, x, y, width=240, graph_height=60, budget_ms=1000 / 60, text_every=15):
+        """Frame-time graph plus per-phase milliseconds; returns the rect drawn over.
+
+        The text is re-rendered every `text_every` frames so it stays readable
+        and the overlay itself stays cheap.
+        """
+        if self.frame_index - self._text_frame >= text_every or not self._text_lines:
+            total = self.frame_ms[-1] if self.frame_ms else 0.0
+            lines = [('frame', total)] + sorted(self.last_phases.items(), key=lambda item: -item[1])
+            self._text_lines = [font.render(f"{label}: {ms:.2f} ms", False, (230, 230, 230)) for label, ms in lines]
+            self._text_lines += [font.render(f"{key}: {value}", False, (160, 200, 255)) for key, value in self._extra_text.items()]
+            self._text_frame = self.frame_index
+        line_height = font.get_linesize()
+        panel = pygame.Rect(x, y, width, graph_height + 8 + line_height * len(self._text_lines))
+        surface.fill((20, 20, 20), panel)
+        # Bars scaled so the frame budget sits at half height
+        scale = graph_height / (2 * budget_ms)
+        bar_w = max(1, width // max(1, self.frame_ms.maxlen))
+        base = y + graph_height
+        for i, ms in enumerate(self.frame_ms):
+            h = min(graph_height, int(ms * scale))
+            color = (0, 200, 0) if ms <= budget_ms else (230, 60, 60)
+            surface.fill(color, (x + i * bar_w, base - h, bar_w, h))
+        pygame.draw.line(surface, (255, 255, 0), (x, base - int(budget_ms * scale)), (x + width - 1, base - int(budget_ms * scale)))
+        text_y = base + 4
+        for line in self._text_lines:
+            surface.blit(line, (x + 4, text_y)); text_y += line_height
+        return panel
@@ -0,0 +1,179 @@
+"""Input-log recording and deterministic replay.
+
+A recording is the GameSim seed and options plus every tick on which the
+player did something: a turn (direction keys), a dart (LMB) or a shockwave
+(RMB). Because the simulation is seeded and advances in fixed ticks, feeding
+the same inputs back on the same ticks reproduces the session exactly.
+
+File format (text, one record per line):
+
+    {"version": 1, "seed": 123, "swarm": false, "turn_buffer": 3, "immediate_turns": false, "flow_field": true}     header
+    5 R                                              ticks since previous record, then codes
+    17 UF                                            U/D/L/R = turn, F = dart, S = shockwave
+    #end {"tick": 2210, "score": 35, "state": "GAME_OVER", "x": 400, "y": 20}
+
+    python replay.py session.log            # headless fast-forward, checks the outcome
+    python replay.py session.log --watch    # real-time in the game window
+    python replay.py --self-test            # record games at uneven frame rates and check they replay
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import bots
+from sim import GameSim, Inputs, NO_INPUT, DIRECTIONS, SIM_DT, TURN_BUFFER_SIZE
+
+REPLAY_VERSION = 1
+DIRECTION_CODES = {'UP': 'U', 'DOWN': 'D', 'LEFT': 'L', 'RIGHT': 'R'}
+CODE_DIRECTIONS = {code: direction for direction, code in DIRECTION_CODES.items()}
+
+def encode_inputs(inputs):
+    return (DIRECTION_CODES.get(inputs.direction, '') + ('F' if inputs.fire else '') + ('S' if inputs.shockwave else ''))
+
+def decode_inputs(codes):
+    direction = next((CODE_DIRECTIONS[c] for c in codes if c in CODE_DIRECTIONS), None)
+    return Inputs(direction, 'F' in codes, 'S' in codes)
+
+def outcome(sim):
+    """What a recording's #end line holds. GameSim stops ticking when a game ends, so `tick` counts the
+    same ticks live and replayed: up to and including the one the game ended on, or to where recording stopped."""
+    return {'tick': sim.tick_count, 'score': sim.score, 'state': sim.game_state, 'x': sim.x, 'y': sim.y}
+
+def matches(result, end):
+    # Recordings from before the snake's position was saved are checked on what they have
+    return all(result.get(key) == value for key, value in end.items())
+
+class InputRecorder:
+    """Collects the inputs GameSim actually applies; attach as `sim.recorder`."""
+
+    def __init__(self, seed, swarm=False, turn_buffer=0, immediate_turns=False, world_size=None, flow_field=True):
+        self.header = {'version': REPLAY_VERSION, 'seed': seed, 'swarm': swarm, 'turn_buffer': turn_buffer, 'immediate_turns': immediate_turns,
+                       'flow_field': flow_field}
+        if world_size: self.header['world_size'] = list(world_size)
+        self.records = [] # (tick, Inputs)
+
+    def record(self, tick, inputs):
+        if encode_inputs(inputs): self.records.append((tick, inputs))
+
+    def save(self, path, sim):
+        lines, previous_tick = [json.dumps(self.header)], 0
+        for tick, inputs in self.records:
+            lines.append(f"{tick - previous_tick} {encode_inputs(inputs)}")
+            previous_tick = tick
+        lines.append("#end " + json.dumps(outcome(sim)))
+        with open(path, 'w') as f: f.write('\n'.join(lines) + '\n')
+
+class Replay:
+    """A loaded recording; `inputs_for` plugs into GameSim.input_source."""
+
+    def __init__(self, header, inputs_by_tick, end):
+        self.header, self.inputs_by_tick, self.end = header, inputs_by_tick, end
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f: lines = f.read().splitlines()
+        header = json.loads(lines[0])
+        if header.get('version') != REPLAY_VERSION:
+            raise ValueError(f"{path}: unsupported replay version {header.get('version')}")
+        inputs_by_tick, tick, end = {}, 0, None
+        for line in lines[1:]:
+            if line.startswith('#end '): end = json.loads(line[5:]); continue
+            if not line.strip(): continue
+            delta, codes = line.split(' ', 1)
+            tick += int(delta)
+            inputs_by_tick[tick] = decode_inputs(codes)
+        return cls(header, inputs_by_tick, end)
+
+    def new_sim(self):
+        # Recordings from before turn buffering or flow fields lack those keys and replay with the original behaviour
+        sim = GameSim(self.header['seed'], swarm=self.header.get('swarm', False), turn_buffer=self.header.get('turn_buffer', 0),
+                      immediate_turns=self.header.get('immediate_turns', False), world_size=self.header.get('world_size'),
+                      flow_field=self.header.get('flow_field', False))
+        sim.input_source = self.inputs_for
+        return sim
+
+    def inputs_for(self, tick):
+        return self.inputs_by_tick.get(tick, NO_INPUT)
+
+def fast_forward(replay):
+    """Run the whole recording headless as fast as possible; returns (sim, seconds)."""
+    sim = replay.new_sim()
+    last_tick = replay.end['tick'] if replay.end else max(replay.inputs_by_tick, default=0) + 1
+    start = time.perf_counter()
+    while sim.is_active and sim.tick_count < last_tick: sim.tick()
+    return sim, time.perf_counter() - start
+
+def round_trip(seed, frames, turn_buffer=TURN_BUFFER_SIZE):
+    """Record a game fed by `frames(sim)`, (dt, [Inputs, ...]) per frame, through queue_input and step()
+    the way the game window feeds it, then replay the recording; returns (recorded, replayed) outcomes."""
+    sim = GameSim(seed, turn_buffer=turn_buffer)
+    recorder = sim.recorder = InputRecorder(seed, turn_buffer=turn_buffer)
+    for dt, presses in frames(sim):
+        if not sim.is_active: break
+        for inputs in presses: sim.queue_input(inputs)
+        sim.step(dt)
+    fd, path = tempfile.mkstemp(suffix='.log'); os.close(fd)
+    try:
+        recorder.save(path, sim)
+        replayed, _ = fast_forward(Replay.load(path))
+    finally:
+        os.remove(path)
+    return outcome(sim), outcome(replayed)
+
+def _turn_chain(sim):
+    # Heading up, three turns pressed over frames too short to run a tick; each must be checked against the one before it
+    return [(SIM_DT, [Inputs('UP')])] * 10 + [(0.0, [Inputs(d)]) for d in ('LEFT', 'DOWN', 'RIGHT')] + [(SIM_DT, [])] * 60
+
+def _uneven_frames(seed, count=20000):
+    # Greedy-bot play at random frame times, some running no tick and some several, with stray presses mixed in
+    def frames(sim):
+        bot, rng = bots.greedy(random.Random(seed)), random.Random(seed)
+        for _ in range(count):
+            presses = [bot(sim)] + [Inputs(rng.choice(list(DIRECTIONS))) for _ in range(rng.random() < 0.2)]
+            yield rng.choice((0.0, 0.004, SIM_DT, 0.03, 0.07)), presses
+    return frames
+
+def self_test(seeds=20):
+    checks = [('turn chain', 0, _turn_chain)] + [(f"seed {seed}", seed, _uneven_frames(seed)) for seed in range(seeds)]
+    failures = 0
+    for name, seed, frames in checks:
+        recorded, replayed = round_trip(seed, frames)
+        if not matches(replayed, recorded): failures += 1; print(f"DIVERGED ({name}): recorded {recorded}, replayed {replayed}")
+    print(f"{len(checks) - failures}/{len(checks)} recordings replay exactly")
+    return 1 if failures else 0
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay a recorded session")
+    parser.add_argument('path', nargs='?')
+    parser.add_argument('--watch', action='store_true', help="play back in real time in the game window")
+    parser.add_argument('--self-test', action='store_true', help="check that recordings made through the game's input path replay exactly")
+    args = parser.parse_args(argv)
+    if args.self_test: return self_test()
+    if args.path is None: parser.error("a recording to replay is required")
+    replay = Replay.load(args.path)
+
+    if args.watch:
+        import game
+        game.init_game()
+        game.play_music("bgm.mp3")
+        game.game_loop(replay=replay)
+        return 0
+
+    sim, elapsed = fast_forward(replay)
+    print(f"Replayed {sim.tick_count} ticks in {elapsed:.3f}s ({sim.tick_count / max(elapsed, 1e-9):.0f} ticks/s)")
+    result = outcome(sim)
+    if replay.end is None:
+        print(f"No recorded outcome to check; ended {result}")
+        return 0
+    if not matches(result, replay.end):
+        print(f"DIVERGED: recorded {replay.end}, replayed {result}")
+        return 1
+    print(f"Matches recording: {result}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Scripted game scenarios shared by the benchmarks, the snapshot round-trip check and the server.
+
+Every scenario is a setup hook that builds the game's starting state, a
+scripted input policy and the GameSim options it runs with, so a seed
+always plays out the same ticks.
+
+    setup, policy, options = SCENARIOS['large_wave']
+    sim = GameSim(seed, **options); setup(sim)
+    sim.tick(policy(sim, sim.tick_count))
+"""
+import math
+import random
+import weakref
+
+import bots
+from sim import Inputs, NO_INPUT, BOSS_MAX_HEALTH_HITS, SIM_DT, TURN_BUFFER_SIZE, snake_block
+
+# --- Input policies: (sim, tick) -> Inputs, with tick counted from the start of each game ---
+def idle_policy(sim, tick):
+    return NO_INPUT
+
+PATROL = ('UP', 'RIGHT', 'DOWN', 'LEFT')
+
+def patrol_policy(sim, tick):
+    # Small clockwise square around the start: one turn every 4 moves
+    return Inputs(PATROL[(tick // 20) % 4] if tick % 20 == 0 else None)
+
+def dart_spam_policy(sim, tick):
+    return Inputs(PATROL[(tick // 20) % 4] if tick % 20 == 0 else None, fire=True)
+
+def shockwave_policy(sim, tick):
+    return Inputs(PATROL[(tick // 20) % 4] if tick % 20 == 0 else None, shockwave=True)
+
+QUICK_TURNS = (('UP', 'LEFT'), ('DOWN', 'RIGHT'))
+
+def quick_turns_policy(sim, tick):
+    # Two presses 2 ticks apart, well inside one move interval: a U-turn up, then one back down.
+    # A 31-tick period drifts against the 5-tick move cadence so presses land at every phase of it.
+    phase = tick % 31
+    if phase not in (0, 2): return NO_INPUT
+    return Inputs(QUICK_TURNS[(tick // 31) % 2][phase // 2])
+
+_boss_bots = weakref.WeakKeyDictionary() # GameSim -> a greedy bot of its own, so each game's tie-break jitter replays the same
+
+def boss_policy(sim, tick):
+    # Kite like the greedy bot: circle the arena away from the boss, snapping round to face it for each shot
+    bot = _boss_bots.get(sim)
+    if bot is None: bot = _boss_bots[sim] = bots.greedy(random.Random(0))
+    return bot(sim)
+
+# --- Setup hooks ---
+def setup_none(sim):
+    pass
+
+def setup_max_bombs(sim):
+    while len(sim.bombs) < sim.max_bombs_on_screen and sim.random_free_pos(): sim.add_new_bomb_item()
+    sim.bomb_spawn_interval = 0 # Refill as soon as shockwaves or restarts clear any
+
+def clear_start_area(sim, radius=250):
+    # Big waves would otherwise land next to the snake and end every game within a few ticks
+    center = sim.snake_rect.center
+    if sim.swarm is not None: sim.swarm.kill(sim.swarm.within(center, radius)); return
+    for enemy in sim.grid.query_radius(center, radius, 'enemy'):
+        if math.hypot(enemy['rect'].centerx - center[0], enemy['rect'].centery - center[1]) < radius: sim.kill_enemy(enemy)
+
+def setup_large_wave(sim):
+    sim.max_wave_size = 400
+    sim.spawn_enemies_wave(400 - sim.enemy_count)
+    clear_start_area(sim)
+
+def setup_horde(sim):
+    sim.spawn_enemies_wave(10000 - sim.enemy_count)
+    clear_start_area(sim)
+
+LARGE_WORLD = (20000, 20000)
+
+def setup_large_world(sim):
+    # 20k enemies and 2k bombs spread over the whole world; only the ones near the snake should cost anything
+    rng = sim.rng
+    for _ in range(20000):
+        sim.add_enemy(rng.randrange(0, sim.world_w, snake_block), rng.randrange(0, sim.world_h, snake_block), sim.enemy_base_speed)
+    for _ in range(2000): sim.add_bomb(rng.randrange(0, sim.world_w, snake_block), rng.randrange(0, sim.world_h, snake_block))
+    clear_start_area(sim)
+
+def setup_bomb_maze(sim):
+    # Max bombs plus a large wave that has to find its way through them
+    setup_max_bombs(sim); setup_large_wave(sim)
+
+def setup_dart_spam(sim):
+    sim.num_darts_per_shot, sim.dart_cooldown = 3, SIM_DT / 2 # A fresh volley every tick
+    setup_large_wave(sim)
+
+def setup_shockwave(sim):
+    sim.shockwave_charges = sim.max_shockwave_charges = 10 ** 6
+    setup_max_bombs(sim); setup_large_wave(sim)
+
+def setup_boss(sim):
+    sim.initialize_boss_fight()
+    sim.num_darts_per_shot, sim.dart_cooldown = 3, 0.1
+    # Half of it goes in ~400 ticks of kiting, then the bot holds out against the raging boss for a few hundred more
+    sim.boss_max_health = sim.boss_health = BOSS_MAX_HEALTH_HITS * 7
+
+# name -> (setup, policy, GameSim keyword arguments). Enemies chase in a straight line unless a scenario asks for
+# the flow field, so figures stay comparable with runs from before it became GameSim's default.
+DIRECT = {'flow_field': False}
+
+SCENARIOS = {
+    'idle': (setup_none, idle_policy, DIRECT),
+    'max_bombs': (setup_max_bombs, patrol_policy, DIRECT),
+    'large_wave': (setup_large_wave, patrol_policy, DIRECT),
+    'horde': (setup_horde, patrol_policy, {**DIRECT, 'swarm': True}),
+    'dart_spam': (setup_dart_spam, dart_spam_policy, DIRECT),
+    'shockwave_sweep': (setup_shockwave, shockwave_policy, DIRECT),
+    'boss_fight': (setup_boss, boss_policy, DIRECT),
+    'large_world': (setup_large_world, patrol_policy, {**DIRECT, 'world_size': LARGE_WORLD}),
+    # Flow-field chasing: bombs to path around, and the same waves as above steering by lookup
+    'bomb_maze': (setup_bomb_maze, patrol_policy, {'flow_field': True}),
+    'large_wave_flow': (setup_large_wave, patrol_policy, {'flow_field': True}),
+    'horde_flow': (setup_horde, patrol_policy, {'swarm': True, 'flow_field': True}),
+    'large_world_flow': (setup_large_world, patrol_policy, {'world_size': LARGE_WORLD, 'flow_field': True}),
+    # Turn handling: the original latest-wins turns against the buffered queue, with and without immediate moves
+    'quick_turns_legacy': (setup_none, quick_turns_policy, DIRECT),
+    'quick_turns': (setup_none, quick_turns_policy, {**DIRECT, 'turn_buffer': TURN_BUFFER_SIZE}),
+    'quick_turns_immediate': (setup_none, quick_turns_policy, {**DIRECT, 'turn_buffer': TURN_BUFFER_SIZE, 'immediate_turns': True}),
+}
@@ -0,0 +1,193 @@
+"""Server-authoritative networked play over asyncio sockets.
+
+    python server.py [--host 0.0.0.0] [--port 7777] [--seed N] [--world WxH] [--bot greedy] [--wave N] [--scenario NAME]
+    python netclient.py [--host H] [--port 7777] [--spectate]
+    python loadtest.py --clients 300 --seconds 30
+
+The server owns the only GameSim and ticks it at SIM_DT. Clients send inputs
+and get snapshots (see netcode.py); they never simulate. GameSim has one
+snake, so every joined player steers it: inputs arriving during a tick are
+merged the way two presses on one tick are, like players sharing a keyboard.
+
+A snapshot is encoded once per SNAPSHOT_EVERY ticks and the same bytes go to
+every client, so a tick costs one encode plus a socket write per client, not
+an encode per client. A client whose socket buffer backs up past
+MAX_CLIENT_BUFFER is skipped rather than queued for, and gets a keyframe once
+it drains.
+"""
+import argparse
+import asyncio
+import gc
+import random
+import socket
+import statistics
+import time
+
+import scenarios
+from bots import load_policy
+from netcode import SnapshotEncoder, INPUT, WELCOME, STATS, QUANTUM, read_message, decode_input, encode_json
+from sim import GameSim, NO_INPUT, SIM_DT, MAX_TICKS_PER_STEP, merge_inputs
+
+DEFAULT_PORT = 7777
+SNAPSHOT_EVERY = 2 # Ticks per snapshot: 30 Hz at the 60 Hz tick rate
+MAX_CLIENT_BUFFER = 64 * 1024 # Bytes queued for one client before it is skipped
+RESTART_DELAY = 3.0 # Seconds the final state stays up before the next game
+STATS_INTERVAL = 1.0
+
+class ClientConnection:
+    __slots__ = ('writer', 'synced', 'skipped', 'bytes_sent')
+
+    def __init__(self, writer):
+        self.writer, self.synced, self.skipped, self.bytes_sent = writer, False, 0, 0
+
+class GameServer:
+    """Runs the game and fans its snapshots out to every connected client."""
+
+    def __init__(self, new_sim, snapshot_every=SNAPSHOT_EVERY, bot=None, log=print):
+        self.new_sim, self.snapshot_every, self.bot, self.log = new_sim, snapshot_every, bot, log
+        self.sim, self.games = new_sim(0), 1
+        self.ticks = 0 # Server ticks, counting on across games and the pause after one
+        self.encoder = SnapshotEncoder()
+        self.clients = []
+        self.pending_inputs = NO_INPUT
+        self.tick_times, self.snapshot_sizes = [], []
+        self.ended_at = None
+        self._prepare_game()
+
+    def _prepare_game(self):
+        # Front-load a new game's one-off costs into the tick that builds it
+        self.sim.warm_up()
+        # A big world is tens of thousands of long-lived objects; left in the collector's oldest
+        # generation they make every full collection a tick-sized stall. Collect the last game now and park the new one.
+        gc.unfreeze(); gc.collect(); gc.freeze()
+
+    # --- Connections ---
+    async def handle_client(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None: sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = ClientConnection(writer)
+        writer.write(encode_json(WELCOME, {'world': [self.sim.world_w, self.sim.world_h], 'snapshot_every': self.snapshot_every,
+                                           'tick_rate': round(1 / SIM_DT), 'quantum': QUANTUM}))
+        self.clients.append(client)
+        try:
+            while True:
+                payload = await read_message(reader)
+                if payload is None: break
+                if payload[:1] == INPUT: self.pending_inputs = merge_inputs(self.pending_inputs, decode_input(payload))
+        except ValueError as e:
+            self.log(f"Dropping {writer.get_extra_info('peername')}: {e}")
+        finally:
+            self.clients.remove(client)
+            writer.close()
+
+    # --- Game ---
+    def tick(self):
+        """One server tick; True if it started a new game instead of stepping one."""
+        sim, restarted = self.sim, False
+        inputs, self.pending_inputs = self.pending_inputs, NO_INPUT
+        if self.bot is not None and sim.is_active: inputs = merge_inputs(self.bot(sim), inputs)
+        if sim.is_active: sim.tick(inputs)
+        elif self.ended_at is None: self.ended_at = time.perf_counter()
+        elif time.perf_counter() - self.ended_at > RESTART_DELAY:
+            self.sim, self.ended_at = self.new_sim(self.games), None; self.games += 1; restarted = True
+            self._prepare_game()
+        self.ticks += 1
+        if self.ticks % self.snapshot_every == 0 and self.clients: self.broadcast()
+        return restarted
+
+    def broadcast(self):
+        delta = self.encoder.delta(self.sim, self.ticks)
+        keyframe = None
+        self.snapshot_sizes.append(len(delta))
+        for client in self.clients:
+            transport = client.writer.transport
+            if transport.is_closing(): continue
+            if transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                client.synced = False; client.skipped += 1; continue # Its baseline is gone; resync with a keyframe
+            if client.synced:
+                message = delta
+            else:
+                if keyframe is None: keyframe = self.encoder.keyframe()
+                message, client.synced = keyframe, True
+            transport.write(message); client.bytes_sent += len(message)
+
+    def stats(self, elapsed):
+        ticks = sorted(self.tick_times)
+        sizes = self.snapshot_sizes
+        clients = self.clients
+        report = {
+            'clients': len(clients), 'tick_ms_p50': ticks[len(ticks) // 2] * 1000 if ticks else 0.0,
+            'tick_ms_p99': ticks[int(0.99 * len(ticks))] * 1000 if ticks else 0.0, 'tick_ms_max': ticks[-1] * 1000 if ticks else 0.0,
+            'snapshot_bytes_mean': statistics.fmean(sizes) if sizes else 0.0, 'snapshot_bytes_max': max(sizes, default=0),
+            'client_kib_per_s': sum(c.bytes_sent for c in clients) / max(1, len(clients)) / elapsed / 1024,
+            'skipped': sum(c.skipped for c in clients), 'enemies': self.sim.enemy_count, 'game': self.games, 'state': self.sim.game_state,
+        }
+        self.tick_times.clear(); self.snapshot_sizes.clear()
+        for client in clients: client.bytes_sent = client.skipped = 0
+        return report
+
+    async def run(self, host, port, report_every=5.0):
+        server = await asyncio.start_server(self.handle_client, host, port, backlog=1024)
+        self.log(f"Serving on {', '.join(str(s.getsockname()) for s in server.sockets)}")
+        loop = asyncio.get_running_loop()
+        next_tick = last_stats = last_report = loop.time()
+        async with server:
+            while True:
+                # Fixed-rate ticks; after a stall, catch up a few and drop the rest like the game loop does
+                behind = 0
+                while loop.time() >= next_tick and behind < MAX_TICKS_PER_STEP:
+                    # Building a new game is a one-off cost, kept out of the per-tick figures
+                    start = time.perf_counter()
+                    if not self.tick(): self.tick_times.append(time.perf_counter() - start)
+                    next_tick += SIM_DT; behind += 1
+                if loop.time() >= next_tick: next_tick = loop.time() + SIM_DT
+                now = loop.time()
+                if now - last_stats >= STATS_INTERVAL:
+                    report = self.stats(now - last_stats); last_stats = now
+                    message = encode_json(STATS, report)
+                    for client in self.clients: client.writer.transport.write(message)
+                    if now - last_report >= report_every:
+                        last_report = now
+                        self.log(f"{report['clients']} clients, tick p50 {report['tick_ms_p50']:.2f} ms p99 {report['tick_ms_p99']:.2f} ms, "
+                                 f"snapshot {report['snapshot_bytes_mean']:.0f} B (max {report['snapshot_bytes_max']}), "
+                                 f"{report['client_kib_per_s']:.1f} KiB/s per client, {report['skipped']} skipped, {report['enemies']} enemies")
+                await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host a networked game")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--seed', type=int, help="first game's seed; later games count up from it")
+    parser.add_argument('--world', metavar='WxH', help="scrolling world size, e.g. 20000x20000")
+    parser.add_argument('--direct-chase', action='store_true', help="enemies head straight for the snake")
+    parser.add_argument('--bot', metavar='POLICY', help="bots.py policy that plays alongside the clients (attract mode, load tests)")
+    parser.add_argument('--wave', type=int, metavar='N', help="start every game with a wave of N enemies, and cap waves there")
+    # Swarm enemies have no identity between ticks to delta against, so horde scenarios are left out
+    parser.add_argument('--scenario', choices=sorted(name for name, (_, _, options) in scenarios.SCENARIOS.items() if not options.get('swarm')),
+                        help="set games up like a benchmark scenario (scenarios.py), played by its scripted inputs")
+    parser.add_argument('--snapshot-every', type=int, default=SNAPSHOT_EVERY, metavar='TICKS')
+    args = parser.parse_args(argv)
+
+    base_seed = args.seed if args.seed is not None else random.randrange(2 ** 31)
+    world_size = tuple(int(v) for v in args.world.split('x')) if args.world else None
+
+    setup, scripted, options = scenarios.SCENARIOS[args.scenario] if args.scenario else (None, None, {})
+    options = {'world_size': world_size, 'flow_field': not args.direct_chase, **options}
+
+    def new_sim(game):
+        sim = GameSim(base_seed + game, **options)
+        if setup: setup(sim)
+        if args.wave: sim.max_wave_size = args.wave; sim.spawn_enemies_wave(args.wave - sim.enemy_count)
+        return sim
+
+    if args.bot: bot = load_policy(args.bot)(random.Random(base_seed))
+    elif scripted: bot = lambda sim: scripted(sim, sim.tick_count)
+    else: bot = None
+    server = GameServer(new_sim, args.snapshot_every, bot)
+    try:
+        asyncio.run(server.run(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
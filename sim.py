@@ -0,0 +1,679 @@
+import math
+import random
+from collections import deque, namedtuple
+
+import pygame
+
+from flowfield import FlowField
+from projectiles import DartPool
+from spatial import EntityList, FreeCells, SpatialHash
+from swarm import EnemySwarm
+
+# World and gameplay constants (shared with the renderer in game.py)
+WIDTH, HEIGHT = 800, 800
+
+snake_block = 20
+game_speed = 60
+enemy_base_speed = 1.1 # Adjusted for balance
+dart_speed_value = 15
+DART_SPREAD_DEG = 15
+game_border_thickness = 20
+
+BOSS_TRIGGER_SCORE = 10 # Adjusted for easier testing, revert to 200 for release
+DART_COOLDOWN_TIME = 1.0
+BOSS_SPEED_FACTOR = 1.05 # Boss speed relative to the enemies' base speed
+BOSS_BASE_SPEED_NORMAL = enemy_base_speed * BOSS_SPEED_FACTOR # Normal boss speed
+BOSS_MAX_HEALTH_HITS = 15
+BOSS_SIZE = snake_block * 3
+SNAKE_MOVE_INTERVAL = 0.08
+TURN_BUFFER_SIZE = 3 # Turns the game window queues ahead of the snake's move ticks
+BOSS_WARNING_DURATION = 3
+MAX_WAVE_SIZE = 10
+HORDE_MAX_WAVE_SIZE = 20000 # Wave cap in swarm (horde) mode
+
+# Fixed simulation timestep: one tick per frame at the original game_speed
+SIM_DT = 1.0 / game_speed
+MAX_TICKS_PER_STEP = 15 # Drop backlog past this instead of spiralling on a stalled machine
+CHUNK_SIZE = 400 # Cell of the coarse enemy index used in worlds bigger than the window
+ACTIVE_MARGIN = WIDTH // 2 # How far past the camera enemies keep chasing and darts keep flying
+
+# Kinds that a new item, bomb or enemy may not be spawned on top of (darts are transient)
+SPAWN_BLOCKING_KINDS = ('snake', 'item', 'bomb', 'enemy', 'boss')
+
+ACTIVE_STATES = ("PLAYING", "BOSS_FIGHT", "BOSS_WARNING")
+DIRECTIONS = {'UP': (0, -1), 'DOWN': (0, 1), 'LEFT': (-1, 0), 'RIGHT': (1, 0)}
+
+# Per-tick player intent: direction is one of DIRECTIONS or None, fire/shockwave are presses
+Inputs = namedtuple('Inputs', 'direction fire shockwave', defaults=(None, False, False))
+NO_INPUT = Inputs()
+
+def merge_inputs(first, second):
+    """Combine two input samples that land on the same tick; the later direction wins."""
+    if first is NO_INPUT: return second
+    if second is NO_INPUT: return first
+    return Inputs(second.direction if second.direction is not None else first.direction,
+                  first.fire or second.fire, first.shockwave or second.shockwave)
+
+def _reverses(direction, heading):
+    """True if `direction` is a U-turn from (vx, vy) `heading`; a stationary snake can go any way."""
+    vx, vy = DIRECTIONS[direction]
+    return heading != (0, 0) and (vx, vy) == (-heading[0], -heading[1])
+
+def camera_view(center, world_rect):
+    """The window-sized view of a world centred on `center` and kept inside it."""
+    view = pygame.Rect(0, 0, WIDTH, HEIGHT)
+    view.center = center
+    return view.clamp(world_rect)
+
+def _compute_dart_vectors(base_direction_str, num_darts, spread_angle_deg):
+    vectors = []
+    base_angle_rad = 0
+    if base_direction_str == 'UP': base_angle_rad = math.radians(-90)
+    elif base_direction_str == 'DOWN': base_angle_rad = math.radians(90)
+    elif base_direction_str == 'LEFT': base_angle_rad = math.radians(180)
+    elif base_direction_str == 'RIGHT': base_angle_rad = math.radians(0)
+    if num_darts == 1:
+        vectors.append((math.cos(base_angle_rad) * dart_speed_value, math.sin(base_angle_rad) * dart_speed_value))
+    else:
+        angle_offsets_rad = []
+        if num_darts == 2:
+            half_spread = math.radians(spread_angle_deg / 2)
+            angle_offsets_rad = [-half_spread, half_spread]
+        elif num_darts >= 3:
+            spread_rad = math.radians(spread_angle_deg)
+            angle_offsets_rad = [-spread_rad, 0, spread_rad]
+        for offset in angle_offsets_rad:
+            current_angle_rad = base_angle_rad + offset
+            dx = math.cos(current_angle_rad) * dart_speed_value
+            dy = math.sin(current_angle_rad) * dart_speed_value
+            vectors.append((dx, dy))
+    return tuple(vectors)
+
+
+# Every volley the game can fire, so shooting never calls cos/sin
+DART_VECTORS = {(direction, num_darts): _compute_dart_vectors(direction, num_darts, DART_SPREAD_DEG)
+                for direction in DIRECTIONS for num_darts in (1, 2, 3)}
+
+def get_dart_vectors(base_direction_str, num_darts, spread_angle_deg=DART_SPREAD_DEG):
+    if spread_angle_deg == DART_SPREAD_DEG and num_darts >= 1:
+        return DART_VECTORS[base_direction_str, min(num_darts, 3)]
+    return _compute_dart_vectors(base_direction_str, num_darts, spread_angle_deg)
+
+class GameSim:
+    """Headless game state advanced in fixed SIM_DT ticks.
+
+    Needs no display or mixer; anything audible or visual that happens during
+    a tick is reported through `events` ('eat', 'bomb', 'boss_fight', 'victory')
+    so a renderer can react to it.
+
+    With `swarm=True` enemies live in a NumPy-backed EnemySwarm instead of
+    `enemies`, for horde-sized waves up to `max_wave_size`. `tuning` overrides
+    balance attributes such as enemy_base_speed or boss_trigger_score before
+    anything spawns; the boss keeps its speed relative to enemy_base_speed
+    unless boss_base_speed is tuned too.
+
+    Turns take effect on the snake's move ticks. With `turn_buffer=0` the
+    latest turn since the last move wins, as in the original game; otherwise
+    up to `turn_buffer` turns queue and are applied one per move, in order,
+    each checked against the one before it. `immediate_turns` moves the snake
+    on the very next tick when a turn arrives with nothing queued, provided
+    half a move interval has passed since the last move.
+
+    `world_size` bigger than the window makes a scrolling world: the camera
+    follows the snake, and only `active_rect` (the view plus ACTIVE_MARGIN)
+    is simulated in full. Enemies outside it stay put, found through a coarse
+    chunk index rather than the full enemy list. Spawns land in the camera
+    view and darts die on leaving the active area. Classic 800x800 games take
+    none of these paths.
+
+    Enemies steer along shortest paths around bombs and walls, as in the
+    game: one FlowField is searched from the snake's cell when the snake
+    changes cell or a bomb comes or goes, and every enemy reads its step from
+    the cell it stands in. `flow_field=False` sends them straight at the
+    snake as the original game did.
+    """
+
+    def __init__(self, seed=None, swarm=False, max_wave_size=None, tuning=None, turn_buffer=0, immediate_turns=False, world_size=None,
+                 flow_field=True):
+        self.rng = random.Random(seed)
+        self.time = 0.0
+        self.tick_count = 0
+        self._accumulator = 0.0
+        self._pending_inputs = NO_INPUT # Fire/shockwave presses waiting for step() to run a tick
+        self._pending_turns = deque(maxlen=MAX_TICKS_PER_STEP) # Directions waiting for step() to run a tick, oldest first
+        self.events = []
+        self.profiler = None # FrameProfiler to charge tick phases to, if any
+        self.recorder = None # Gets record(tick, inputs) for every tick run (see replay.py)
+        self.input_source = None # tick -> Inputs; when set it replaces the inputs passed in (replays)
+        self.world_w, self.world_h = world_size or (WIDTH, HEIGHT)
+        self.world_rect = pygame.Rect(0, 0, self.world_w, self.world_h)
+        self.large_world = self.world_w > WIDTH or self.world_h > HEIGHT
+        self.active_rect = pygame.Rect(self.world_rect) # Simulated in full; the whole board unless the world scrolls
+        self.enemy_chunks = SpatialHash(CHUNK_SIZE) if self.large_world else None
+        # Every entity, for collision queries; also keeps the spawnable free-cell index up to date.
+        # A big world has too many cells to index, so spawns there sample near the player instead.
+        spawn_cells = None if self.large_world else FreeCells(
+            game_border_thickness // snake_block, game_border_thickness // snake_block,
+            (self.world_w - game_border_thickness - snake_block - 1) // snake_block,
+            (self.world_h - game_border_thickness - snake_block - 1) // snake_block)
+        self.grid = SpatialHash(snake_block, spawn_cells, SPAWN_BLOCKING_KINDS)
+        border_cells = game_border_thickness // snake_block
+        cols, rows = self.world_w // snake_block, self.world_h // snake_block
+        # Cells the snake can stand in without hitting a wall; a big world only searches as far as the active area reaches
+        self.flow_field = FlowField(cols, rows, (border_cells, border_cells, cols - border_cells - 1, rows - border_cells - 1),
+                                    (WIDTH // 2 + ACTIVE_MARGIN) // snake_block if self.large_world else None) if flow_field else None
+
+        self.game_state = "PLAYING"
+        self.x, self.y = self.world_w // 2 // snake_block * snake_block, self.world_h // 2 // snake_block * snake_block
+        self.snake_visual_size = snake_block
+        self.score = 0
+
+        self.snake_vx, self.snake_vy = 0, 0
+        self.last_committed_vx, self.last_committed_vy = 0, 0
+        self.last_snake_move_time = -math.inf # First tick moves immediately
+        self.snake_move_interval = SNAKE_MOVE_INTERVAL
+        self.turn_buffer, self.turn_queue = turn_buffer, deque() # (direction, tick it arrived)
+        self.immediate_turns, self.immediate_turn_min_gap = immediate_turns, SNAKE_MOVE_INTERVAL / 2
+        self._turn_tick, self._move_now = None, False # Tick of the turn the next move applies
+        # Input-to-motion latency: sim seconds from a turn's tick to the move that applied it
+        self.turn_latencies, self.turns_applied, self.turns_dropped = deque(maxlen=512), 0, 0
+
+        self.apple_pos, self.apple_rect = None, None
+        self.blue_item_pos, self.blue_item_rect = None, None
+        self.blue_item_active_timer, self.apples_eaten_for_blue_item, self.blue_items_eaten_this_game = 0, 0, 0
+        self.blue_item_spawn_delay = 7
+
+        self.darts, self.dart_ready, self.last_dart_time = DartPool(snake_block), True, 0
+        self.dart_cooldown = DART_COOLDOWN_TIME
+        self.snake_facing_direction_str = 'UP'
+        self.num_darts_per_shot = 1
+
+        self.enemies, self.num_enemies_to_spawn_next, self.last_enemy_cleared_time = EntityList(), 1, 0
+        self.enemy_respawn_delay = 5
+        self.swarm = EnemySwarm(snake_block) if swarm else None
+        self.max_wave_size = max_wave_size or (HORDE_MAX_WAVE_SIZE if swarm else MAX_WAVE_SIZE)
+
+        self.bombs, self.last_bomb_spawn_time = EntityList(), self.time
+        self.bomb_spawn_interval, self.max_bombs_on_screen = 10, 15
+
+        self.shockwave_active, self.shockwave_radius, self.shockwave_charges, self.max_shockwave_charges = False, 0, 1, 5
+        self.max_shockwave_radius = 250
+
+        self.boss_rect, self.boss_health = None, 0
+        self.boss_max_health = BOSS_MAX_HEALTH_HITS
+        self.current_boss_speed = BOSS_BASE_SPEED_NORMAL
+        self.boss_rage_mode_active = False
+        self.boss_size = BOSS_SIZE
+
+        self.warning_start_time = 0
+        self.boss_trigger_score = BOSS_TRIGGER_SCORE
+        self.enemy_base_speed = enemy_base_speed
+        self.boss_base_speed = None # Follows a tuned enemy_base_speed unless tuned itself
+
+        # Outcome bookkeeping for analysis tools
+        self.death_cause = None # 'wall', 'bomb', 'enemy' or 'boss'
+        self.boss_fight_start_time = None
+
+        for name, value in (tuning or {}).items():
+            if not hasattr(self, name) or name.startswith('_'): raise ValueError(f"unknown tuning parameter: {name}")
+            setattr(self, name, value)
+        if self.boss_base_speed is None: self.boss_base_speed = self.enemy_base_speed * BOSS_SPEED_FACTOR
+        self.current_boss_speed = self.boss_base_speed
+
+        self.snake_rect = pygame.Rect(self.x, self.y, self.snake_visual_size, self.snake_visual_size)
+        self.grid.insert(self.snake_rect, self.snake_rect, 'snake')
+        self._update_active_rect()
+
+        self.spawn_apple()
+        if not self.enemy_count: self.spawn_enemies_wave(self.num_enemies_to_spawn_next); self.last_enemy_cleared_time = self.time
+
+    @property
+    def is_active(self):
+        return self.game_state in ACTIVE_STATES
+
+    @property
+    def enemy_count(self):
+        return len(self.swarm) if self.swarm is not None else len(self.enemies)
+
+    def enemy_rects(self, area=None):
+        """Enemy boxes; with `area`, at least those near it (all of them on a classic board)."""
+        if self.swarm is not None: return self.swarm.rects(None if area is None else self.swarm.overlapping(area))
+        if area is not None and self.enemy_chunks is not None: return [enemy['rect'] for enemy in self.enemy_chunks.query(area, 'enemy')]
+        return [enemy['rect'] for enemy in self.enemies]
+
+    def bomb_rects(self, area=None):
+        """Bomb boxes; with `area`, the ones overlapping it in a big world (all of them on a classic board)."""
+        if area is not None and self.large_world: return self.grid.query(area, 'bomb')
+        return self.bombs
+
+    def camera_rect(self):
+        """The window-sized view of the world, centred on the snake and kept inside the world."""
+        return camera_view(self.snake_rect.center, self.world_rect)
+
+    def _update_active_rect(self):
+        if self.large_world: self.active_rect = self.camera_rect().inflate(2 * ACTIVE_MARGIN, 2 * ACTIVE_MARGIN).clip(self.world_rect)
+
+    def _enemies_left(self):
+        """Enemies still in play for wave purposes; ones left behind outside the active area don't count."""
+        if self.enemy_chunks is None or self.swarm is not None: return self.enemy_count
+        return len(self.enemy_chunks.query(self.active_rect, 'enemy'))
+
+    # --- Spawning ---
+    def free_spawn_cells(self, count):
+        """Up to `count` distinct random lattice cells that no entity overlaps."""
+        free_cells = self.grid.free_cells
+        if free_cells is None: return self._sample_cells_near(count)
+        if self.swarm is None or not len(self.swarm): return free_cells.sample_many(count, self.rng)
+        # Swarm enemies are not in the grid; filter their cells out for this one draw
+        taken = self.swarm.occupied_cells(snake_block)
+        candidates = [cell for cell in free_cells if cell not in taken]
+        return self.rng.sample(candidates, min(count, len(candidates)))
+
+    def _sample_cells_near(self, count):
+        # Rejection sampling inside the walls and the camera view, like the classic board; a few misses on a crowded view are fine
+        area = self.camera_rect().clip(self.world_rect.inflate(-2 * game_border_thickness, -2 * game_border_thickness))
+        col0, row0 = -(-area.left // snake_block), -(-area.top // snake_block)
+        col1, row1 = (area.right - snake_block - 1) // snake_block, (area.bottom - snake_block - 1) // snake_block
+        if col1 < col0 or row1 < row0: return []
+        cells, seen, grid, rng = [], set(), self.grid, self.rng
+        for _ in range(count * 4 + 16):
+            if len(cells) >= count: break
+            cell = (rng.randint(col0, col1), rng.randint(row0, row1))
+            if cell not in seen and not grid.blocked(cell): seen.add(cell); cells.append(cell)
+        return cells
+
+    def random_free_pos(self):
+        """Top-left of a random lattice cell no entity overlaps, or None if the board is full."""
+        if self.swarm is None and self.grid.free_cells is not None: cell = self.grid.free_cells.sample(self.rng)
+        else: cell = next(iter(self.free_spawn_cells(1)), None)
+        return None if cell is None else (cell[0] * snake_block, cell[1] * snake_block)
+
+    def spawn_apple(self):
+        self.clear_apple()
+        pos = self.random_free_pos()
+        if pos is None: return
+        self.apple_pos = pos
+        self.apple_rect = pygame.Rect(self.apple_pos[0], self.apple_pos[1], snake_block, snake_block)
+        self.grid.insert(self.apple_rect, self.apple_rect, 'item')
+
+    def clear_apple(self):
+        if self.apple_rect: self.grid.remove(self.apple_rect)
+        self.apple_pos, self.apple_rect = None, None
+
+    def spawn_blue_item(self):
+        self.clear_blue_item()
+        pos = self.random_free_pos()
+        if pos is None: return
+        self.blue_item_pos = pos
+        self.blue_item_rect = pygame.Rect(self.blue_item_pos[0], self.blue_item_pos[1], snake_block, snake_block)
+        self.grid.insert(self.blue_item_rect, self.blue_item_rect, 'item')
+        self.blue_item_active_timer = self.time
+
+    def clear_blue_item(self):
+        if self.blue_item_rect: self.grid.remove(self.blue_item_rect)
+        self.blue_item_pos, self.blue_item_rect = None, None
+
+    def spawn_enemies_wave(self, count):
+        # One draw of distinct free cells for the whole wave
+        cells = self.free_spawn_cells(count)
+        if self.swarm is not None:
+            # Hordes can outnumber the free cells; the overflow stacks on cells already drawn
+            if cells and len(cells) < count: cells += self.rng.choices(cells, k=count - len(cells))
+            self.swarm.add([cx * snake_block for cx, _ in cells], [cy * snake_block for _, cy in cells],
+                           [self.enemy_base_speed + self.rng.uniform(-0.2, 0.2) for _ in cells])
+            return
+        for cx, cy in cells:
+            self.add_enemy(cx * snake_block, cy * snake_block, self.enemy_base_speed + self.rng.uniform(-0.2, 0.2)) # Slightly vary speed
+
+    def add_enemy(self, x, y, speed):
+        enemy = {'rect': pygame.Rect(x, y, snake_block, snake_block), 'speed': speed}
+        self.enemies.append(enemy); self.grid.insert(enemy, enemy['rect'], 'enemy')
+        if self.enemy_chunks is not None: self.enemy_chunks.insert(enemy, enemy['rect'], 'enemy')
+        return enemy
+
+    def add_new_bomb_item(self):
+        bombs_near = len(self.grid.query(self.active_rect, 'bomb')) if self.large_world else len(self.bombs)
+        if bombs_near >= self.max_bombs_on_screen: return
+        pos = self.random_free_pos()
+        if pos is None: return
+        self.add_bomb(*pos)
+
+    def add_bomb(self, x, y):
+        bomb_r = pygame.Rect(x, y, snake_block, snake_block)
+        self.bombs.append(bomb_r); self.grid.insert(bomb_r, bomb_r, 'bomb')
+        if self.flow_field is not None: self.flow_field.block(x // snake_block, y // snake_block)
+        return bomb_r
+
+    def kill_enemy(self, enemy):
+        self.enemies.remove(enemy); self.grid.remove(enemy)
+        if self.enemy_chunks is not None: self.enemy_chunks.remove(enemy)
+
+    def remove_bomb(self, bomb_r):
+        self.bombs.remove(bomb_r); self.grid.remove(bomb_r)
+        if self.flow_field is not None: self.flow_field.unblock(bomb_r.x // snake_block, bomb_r.y // snake_block)
+
+    def remove_dart(self, dart):
+        self.darts.release(dart)
+
+    def initialize_boss_fight(self):
+        self.game_state = "BOSS_FIGHT"
+        self.enemies.clear(); self.bombs.clear(); self.darts.clear()
+        if self.swarm is not None: self.swarm.clear()
+        self.apple_pos, self.apple_rect, self.blue_item_pos, self.blue_item_rect = None, None, None, None
+        for kind in ('enemy', 'bomb', 'item'): self.grid.clear(kind)
+        if self.enemy_chunks is not None: self.enemy_chunks.clear()
+        if self.flow_field is not None: self.flow_field.clear_blocked()
+        view = self.camera_rect()
+        boss_x, boss_y = view.centerx - self.boss_size // 2, view.top + game_border_thickness + 20
+        self.boss_rect, self.boss_health = pygame.Rect(boss_x, boss_y, self.boss_size, self.boss_size), self.boss_max_health
+        self.grid.insert(self.boss_rect, self.boss_rect, 'boss')
+        self.current_boss_speed = self.boss_base_speed
+        self.boss_rage_mode_active = False
+        self.boss_fight_start_time = self.time
+        self.events.append('boss_fight')
+
+    # --- Stepping ---
+    def warm_up(self):
+        """Do a new game's one-off work before its first tick; call it once setup is done.
+
+        The flow field's first search fills its neighbour cache cell by cell, tens
+        of ms in a big world. Searching from the snake now leaves the first tick
+        the same result from a warm cache.
+        """
+        field = self.flow_field
+        if field is not None: field.set_target(self.snake_rect.centerx // snake_block, self.snake_rect.centery // snake_block); field.refresh()
+
+    def step(self, dt, inputs=NO_INPUT):
+        """Advance by `dt` seconds of wall time in whole SIM_DT ticks.
+
+        Inputs are held until the next tick actually runs, so a press made on a
+        frame shorter than SIM_DT is never dropped; leftover time carries over
+        to the next call. Directions from frames that ran no tick queue up and
+        go to the ticks that follow one each, so a quick pair of turns reaches
+        the turn buffer as two turns rather than the later replacing the
+        earlier. Stops at the tick the game ends on, so `tick_count` is where
+        a replay of the same inputs stops too. Returns the number of ticks run.
+        """
+        self.queue_input(inputs)
+        turns = self._pending_turns
+        self._accumulator += dt
+        ticks = 0
+        while self._accumulator >= SIM_DT and ticks < MAX_TICKS_PER_STEP and self.is_active:
+            presses = self._pending_inputs
+            self.tick(Inputs(turns.popleft(), presses.fire, presses.shockwave) if turns else presses); self._pending_inputs = NO_INPUT
+            self._accumulator -= SIM_DT; ticks += 1
+        if ticks == MAX_TICKS_PER_STEP: self._accumulator = 0.0
+        return ticks
+
+    def queue_input(self, inputs):
+        """Hold one input sample for the ticks step() runs next; call it once per press to keep each turn.
+
+        With a turn buffer, a turn is checked here against the one queued just
+        before it, since that is the heading it will follow; ticks only check
+        against what the snake has committed to or buffered, so a replay of the
+        ticks' inputs makes the same calls. A replay's own inputs replace any.
+        """
+        if self.input_source is not None: return
+        direction, turns = inputs.direction, self._pending_turns
+        if direction is not None and self.turn_buffer and turns:
+            if direction == turns[-1]: direction = None # Not a turn
+            elif _reverses(direction, DIRECTIONS[turns[-1]]): self.turns_dropped += 1; direction = None
+        if direction is not None: turns.append(direction)
+        if inputs.fire or inputs.shockwave: self._pending_inputs = merge_inputs(self._pending_inputs, Inputs(None, inputs.fire, inputs.shockwave))
+
+    def tick(self, inputs=NO_INPUT):
+        """Run exactly one fixed SIM_DT tick; once the game has ended, do nothing."""
+        self.events.clear()
+        if not self.is_active: return
+        if self.input_source is not None: inputs = self.input_source(self.tick_count)
+        if self.recorder is not None: self.recorder.record(self.tick_count, inputs)
+        self._apply_inputs(inputs)
+        self._update(self.time)
+        self.time += SIM_DT; self.tick_count += 1
+
+    def can_turn(self, direction):
+        # Check for 180-degree turn against the *last committed* direction, or the last buffered turn.
+        # Allow change if snake is stationary (last_committed_vx/vy are 0)
+        if self.turn_queue: heading = DIRECTIONS[self.turn_queue[-1][0]]
+        else: heading = (self.last_committed_vx, self.last_committed_vy)
+        return not _reverses(direction, heading)
+
+    def _turn(self, direction):
+        vx, vy = DIRECTIONS[direction]
+        queue = self.turn_queue
+        if self.turn_buffer:
+            if (queue and queue[-1][0] == direction) or (not queue and (vx, vy) == (self.snake_vx, self.snake_vy)): return # Not a turn
+            if not self.can_turn(direction) or len(queue) >= self.turn_buffer: self.turns_dropped += 1; return
+            queue.append((direction, self.tick_count))
+            first = len(queue) == 1
+        else:
+            if (vx, vy) == (self.snake_vx, self.snake_vy): return
+            if not self.can_turn(direction): self.turns_dropped += 1; return
+            first = self._turn_tick is None
+            if not first: self.turns_dropped += 1 # Replaced before the snake moved on it
+            self.snake_vx, self.snake_vy, self._turn_tick = vx, vy, self.tick_count
+            self.snake_facing_direction_str = direction
+        if first and self.immediate_turns and self.time - self.last_snake_move_time >= self.immediate_turn_min_gap: self._move_now = True
+
+    def _apply_inputs(self, inputs):
+        if inputs.direction is not None: self._turn(inputs.direction)
+
+        if inputs.fire and self.dart_ready:
+            self.dart_ready, self.last_dart_time = False, self.time
+            dsx, dsy = self.snake_rect.centerx - snake_block // 2, self.snake_rect.centery - snake_block // 2
+            for dv_x, dv_y in get_dart_vectors(self.snake_facing_direction_str, self.num_darts_per_shot):
+                self.darts.spawn(dsx, dsy, dv_x, dv_y, self.snake_facing_direction_str)
+        if inputs.shockwave and self.shockwave_charges > 0 and not self.shockwave_active:
+            self.shockwave_active, self.shockwave_radius, self.shockwave_charges = True, 1, self.shockwave_charges - 1
+
+    def _game_over(self, cause):
+        self.events.append('bomb'); self.game_state = "GAME_OVER"; self.death_cause = cause
+
+    def _damage_boss(self, amount):
+        self.boss_health -= amount
+        if not self.boss_rage_mode_active and self.boss_health <= self.boss_max_health / 2:
+            self.boss_rage_mode_active = True
+            self.current_boss_speed = self.boss_base_speed * 2
+        if self.boss_health <= 0: self.game_state = "VICTORY"; self.events.append('victory')
+
+    def _snake_hits_hazard(self):
+        """'bomb' or 'enemy' if the snake is touching one, else None."""
+        for bomb_r in self.grid.query(self.snake_rect, 'bomb'):
+            if self.snake_rect.colliderect(bomb_r): return 'bomb'
+        if self.swarm is not None: return 'enemy' if self.swarm.overlapping(self.snake_rect).any() else None
+        for enemy in self.grid.query(self.snake_rect, 'enemy'):
+            if self.snake_rect.colliderect(enemy['rect']): return 'enemy'
+        return None
+
+    def _update(self, current_time):
+        snake_rect = self.snake_rect
+        prof = self.profiler
+        if self._move_now or current_time - self.last_snake_move_time > self.snake_move_interval:
+            self._move_now = False
+            if self.turn_queue:
+                direction, self._turn_tick = self.turn_queue.popleft()
+                self.snake_vx, self.snake_vy = DIRECTIONS[direction]; self.snake_facing_direction_str = direction
+            if self.snake_vx != 0 or self.snake_vy != 0:
+                self.x += self.snake_vx * snake_block
+                self.y += self.snake_vy * snake_block
+                if self._turn_tick is not None and (self.snake_vx, self.snake_vy) != (self.last_committed_vx, self.last_committed_vy):
+                    self.turn_latencies.append((self.tick_count - self._turn_tick) * SIM_DT); self.turns_applied += 1
+                self._turn_tick = None
+                self.last_committed_vx, self.last_committed_vy = self.snake_vx, self.snake_vy
+            self.last_snake_move_time = current_time
+
+        snake_rect.topleft = (self.x, self.y); snake_rect.size = (self.snake_visual_size, self.snake_visual_size)
+        self.grid.move(snake_rect, snake_rect)
+        self._update_active_rect()
+        if not (game_border_thickness <= snake_rect.left and snake_rect.right <= self.world_w - game_border_thickness and \
+                game_border_thickness <= snake_rect.top and snake_rect.bottom <= self.world_h - game_border_thickness):
+            self._game_over('wall')
+        if not self.dart_ready and current_time - self.last_dart_time > self.dart_cooldown: self.dart_ready = True
+        if prof: prof.mark('sim: snake')
+
+        if self.game_state == "PLAYING":
+            if self.score >= self.boss_trigger_score: self.game_state = "BOSS_WARNING"; self.warning_start_time = current_time
+            if not self.blue_item_pos and self.apples_eaten_for_blue_item >= 3: self.spawn_blue_item(); self.apples_eaten_for_blue_item = 0
+            if self.blue_item_rect and current_time - self.blue_item_active_timer > self.blue_item_spawn_delay: self.clear_blue_item()
+            if self.large_world and self.apple_rect and not self.active_rect.colliderect(self.apple_rect): self.spawn_apple() # Left behind
+            if not self._enemies_left() and current_time - self.last_enemy_cleared_time > self.enemy_respawn_delay:
+                self.num_enemies_to_spawn_next = min(self.num_enemies_to_spawn_next * 2, self.max_wave_size)
+                self.spawn_enemies_wave(self.num_enemies_to_spawn_next); self.last_enemy_cleared_time = current_time
+            if current_time - self.last_bomb_spawn_time > self.bomb_spawn_interval: self.add_new_bomb_item(); self.last_bomb_spawn_time = current_time
+            if prof: prof.mark('sim: spawning')
+            field = self.flow_field
+            if field is not None:
+                field.set_target(snake_rect.centerx // snake_block, snake_rect.centery // snake_block); field.refresh()
+                if prof: prof.mark('sim: flow field')
+            if self.swarm is not None: self.swarm.chase(snake_rect.centerx, snake_rect.centery, field)
+            chunks = self.enemy_chunks
+            for enemy in (self.enemies if chunks is None else chunks.query(self.active_rect, 'enemy')):
+                rect, speed = enemy['rect'], enemy['speed']
+                step = field.direction(rect.centerx // snake_block, rect.centery // snake_block) if field is not None else None
+                if step is not None: self._follow_step(rect, step, speed, field) # Around obstacles
+                else: # The snake's own cell and unreachable ones go straight
+                    if snake_rect.centerx > rect.centerx: rect.x += speed
+                    elif snake_rect.centerx < rect.centerx: rect.x -= speed
+                    if snake_rect.centery > rect.centery: rect.y += speed
+                    elif snake_rect.centery < rect.centery: rect.y -= speed
+                self.grid.move(enemy, rect)
+                if chunks is not None: chunks.move(enemy, rect)
+            if prof: prof.mark('sim: enemy chase')
+            if self.apple_rect and snake_rect.colliderect(self.apple_rect):
+                self.events.append('eat'); self.score += 5; self.snake_visual_size = min(self.snake_visual_size + 2, snake_block * 2.5)
+                self.apples_eaten_for_blue_item += 1; self.spawn_apple()
+            if self.blue_item_rect and snake_rect.colliderect(self.blue_item_rect):
+                self.events.append('eat'); self.blue_items_eaten_this_game += 1
+                if self.blue_items_eaten_this_game == 1: self.num_darts_per_shot = 2
+                elif self.blue_items_eaten_this_game >= 2: self.num_darts_per_shot = 3
+                if self.blue_items_eaten_this_game % 3 == 0: self.shockwave_charges = min(self.shockwave_charges + 1, self.max_shockwave_charges)
+                self.clear_blue_item()
+            hit_hazard = self._snake_hits_hazard()
+            if prof: prof.mark('sim: snake collisions')
+            if hit_hazard: self._game_over(hit_hazard); return
+
+        elif self.game_state == "BOSS_WARNING":
+            if current_time - self.warning_start_time > BOSS_WARNING_DURATION: self.initialize_boss_fight()
+            hit_hazard = self._snake_hits_hazard()
+            if hit_hazard: self._game_over(hit_hazard); return
+
+        elif self.game_state == "BOSS_FIGHT":
+            boss_rect = self.boss_rect
+            if boss_rect:
+                if snake_rect.centerx > boss_rect.centerx: boss_rect.x += self.current_boss_speed
+                elif snake_rect.centerx < boss_rect.centerx: boss_rect.x -= self.current_boss_speed
+                if snake_rect.centery > boss_rect.centery: boss_rect.y += self.current_boss_speed
+                elif snake_rect.centery < boss_rect.centery: boss_rect.y -= self.current_boss_speed
+                boss_rect.clamp_ip(self.world_rect); self.grid.move(boss_rect, boss_rect)
+                if snake_rect.colliderect(boss_rect): self._game_over('boss')
+            if prof: prof.mark('sim: boss')
+
+        if self.is_active:
+            self._update_darts(current_time)
+            if prof: prof.mark('sim: darts')
+            if self.shockwave_active:
+                self._update_shockwave(current_time)
+                if prof: prof.mark('sim: shockwave')
+
+    def _follow_step(self, rect, step, speed, field):
+        # The step is for the cell under the enemy's centre, but its one-cell body can overlap the next lane
+        # over. Line up with the lane on an axis the step doesn't use, and only advance along one while every
+        # cell the body would cover is clear, so bodies round corners instead of clipping them.
+        dx, dy = step
+        x, y = rect.x, rect.y
+        if dx:
+            rect.x = x + dx * speed
+            # Only a leading edge crossing into the next cell can reach a blocked one
+            if ((rect.x - 1) // snake_block != (x - 1) // snake_block if dx > 0 else rect.x // snake_block != x // snake_block):
+                self._back_off(rect, 0, x, field)
+        elif x % snake_block:
+            rect.x = x + max(-speed, min(speed, rect.centerx // snake_block * snake_block - x))
+        if dy:
+            rect.y = y + dy * speed
+            if ((rect.y - 1) // snake_block != (y - 1) // snake_block if dy > 0 else rect.y // snake_block != y // snake_block):
+                self._back_off(rect, 1, y, field)
+        elif y % snake_block:
+            rect.y = y + max(-speed, min(speed, rect.centery // snake_block * snake_block - y))
+
+    def _back_off(self, rect, axis, pos, field):
+        """Undo a move along `axis` that put the body on a blocked cell, unless it started on one."""
+        if self._body_clear(rect, field): return
+        moved = rect[axis]; rect[axis] = pos
+        if not self._body_clear(rect, field): rect[axis] = moved
+
+    def _body_clear(self, rect, field):
+        return field.area_clear(rect.left // snake_block, rect.top // snake_block, (rect.right - 1) // snake_block, (rect.bottom - 1) // snake_block)
+
+    def _update_darts(self, current_time):
+        # Walk the pool backwards: a release swaps in the last dart, which has already moved
+        grid, pool, active_rect = self.grid, self.darts, self.active_rect
+        active = pool.active
+        hunting = self.game_state in ("PLAYING", "BOSS_WARNING")
+        for i in range(len(active) - 1, -1, -1):
+            dart = active[i]; rect = dart.rect
+            dart.exact_x += dart.dx; dart.exact_y += dart.dy
+            rect.x, rect.y = int(dart.exact_x), int(dart.exact_y)
+            if not active_rect.colliderect(rect): pool.release(dart); continue
+            if hunting:
+                if self.swarm is not None:
+                    hit = self.swarm.first_overlapping(rect)
+                    if hit is not None: self.swarm.mark_dead(hit)
+                else:
+                    hit = next((e for e in grid.query(rect, 'enemy') if rect.colliderect(e['rect'])), None)
+                    if hit: self.kill_enemy(hit)
+                if hit is not None:
+                    self.score += 10
+                    pool.release(dart)
+                    if not self._enemies_left() and self.game_state == "PLAYING": self.last_enemy_cleared_time = current_time
+                    continue
+            if self.game_state == "BOSS_FIGHT" and self.boss_rect and rect.colliderect(self.boss_rect):
+                pool.release(dart)
+                self._damage_boss(1)
+        if self.swarm is not None: self.swarm.compact()
+
+    def _update_shockwave(self, current_time):
+        self.shockwave_radius += 10; shockwave_center = self.snake_rect.center
+        if self.game_state in ["PLAYING", "BOSS_WARNING"]:
+            # Entities are snake_block wide, so pad the cell search by one block
+            reach = self.shockwave_radius + snake_block
+            if self.swarm is not None: self.score += 10 * self.swarm.kill(self.swarm.within(shockwave_center, self.shockwave_radius))
+            for enemy in self.grid.query_radius(shockwave_center, reach, 'enemy'):
+                if math.hypot(enemy['rect'].centerx - shockwave_center[0], enemy['rect'].centery - shockwave_center[1]) < self.shockwave_radius + (enemy['rect'].width // 2):
+                    self.kill_enemy(enemy); self.score += 10
+            if not self._enemies_left() and self.game_state == "PLAYING": self.last_enemy_cleared_time = current_time
+            for bomb_r in self.grid.query_radius(shockwave_center, reach, 'bomb'):
+                if math.hypot(bomb_r.centerx - shockwave_center[0], bomb_r.centery - shockwave_center[1]) < self.shockwave_radius + (bomb_r.width // 2):
+                    self.remove_bomb(bomb_r); self.score += 2
+        if self.game_state == "BOSS_FIGHT" and self.boss_rect:
+            if math.hypot(self.boss_rect.centerx - shockwave_center[0], self.boss_rect.centery - shockwave_center[1]) < self.shockwave_radius + (self.boss_rect.width // 2):
+                self.shockwave_active = False
+                self._damage_boss(2)
+        if self.shockwave_radius > self.max_shockwave_radius and self.shockwave_active: self.shockwave_active = False
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Headless smoke run: random inputs, reports simulation throughput")
+    parser.add_argument('ticks', nargs='?', type=int, default=100000)
+    parser.add_argument('--swarm', type=int, metavar='N', help="swarm mode, starting with a wave of N chasers")
+    args = parser.parse_args()
+
+    def new_game(seed):
+        game = GameSim(seed=seed, swarm=bool(args.swarm))
+        if args.swarm:
+            # Clear round the snake as bench.py's horde scenario does, or the wave lands on it and every game ends on its first tick
+            game.spawn_enemies_wave(args.swarm - game.enemy_count)
+            game.swarm.kill(game.swarm.within(game.snake_rect.center, 250))
+        return game
+
+    num_ticks = args.ticks
+    sim, bot_rng = new_game(0), random.Random(0)
+    elapsed, games = 0.0, 1
+    for _ in range(num_ticks):
+        if not sim.is_active: sim = new_game(games); games += 1 # Restarts stay out of the timing
+        start = time.perf_counter()
+        sim.tick(Inputs(bot_rng.choice(list(DIRECTIONS)) if bot_rng.random() < 0.1 else None,
+                        bot_rng.random() < 0.05, bot_rng.random() < 0.01))
+        elapsed += time.perf_counter() - start
+    print(f"{num_ticks} ticks over {games} games in {elapsed:.2f}s ({num_ticks / elapsed:.0f} ticks/s)")
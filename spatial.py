@@ -0,0 +1,232 @@
+class FreeCells:
+    """Set of unoccupied cells inside a spawn area with O(1) add, remove and sample.
+
+    Cells live in a dense list; removal swaps the last cell into the hole, so
+    drawing a random free cell is a single index into the list.
+    """
+
+    def __init__(self, col0, row0, col1, row1):
+        self.bounds = (col0, row0, col1, row1)
+        self._cells = [(cx, cy) for cy in range(row0, row1 + 1) for cx in range(col0, col1 + 1)]
+        self._slots = {cell: i for i, cell in enumerate(self._cells)}
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __contains__(self, cell):
+        return cell in self._slots
+
+    def __iter__(self):
+        return iter(self._cells)
+
+    def occupy(self, cell):
+        slot = self._slots.pop(cell, None)
+        if slot is None: return
+        last = self._cells.pop()
+        if slot < len(self._cells): self._cells[slot] = last; self._slots[last] = slot
+
+    def release(self, cell):
+        col0, row0, col1, row1 = self.bounds
+        if cell in self._slots or not (col0 <= cell[0] <= col1 and row0 <= cell[1] <= row1): return
+        self._slots[cell] = len(self._cells); self._cells.append(cell)
+
+    def sample(self, rng):
+        """A random free cell, or None when the area is full."""
+        if not self._cells: return None
+        return self._cells[int(rng.random() * len(self._cells))]
+
+    def sample_many(self, count, rng):
+        """Up to `count` distinct free cells in one draw."""
+        return rng.sample(self._cells, min(count, len(self._cells)))
+
+
+class EntityList:
+    """Insertion-ordered entities with O(1) removal by identity.
+
+    Members are keyed on id() in a dict, which keeps their order, so removing
+    one is a hash lookup rather than a scan of every entity in the world, and
+    Rects or dicts that compare equal by value are still told apart.
+    """
+
+    def __init__(self):
+        self._items = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def append(self, obj):
+        self._items[id(obj)] = obj
+
+    def remove(self, obj):
+        self._items.pop(id(obj), None)
+
+    def clear(self):
+        self._items.clear()
+
+
+class SpatialHash:
+    """Uniform grid over the world, keyed on (col, row) cells of `cell_size` pixels.
+
+    Entities are tracked by identity together with a kind tag ('snake', 'enemy',
+    'bomb', 'item', 'boss') and the span of cells their rect covers. `move` only
+    touches the cell dicts when that span actually changes, so per-tick updates
+    for slow movers are a couple of integer divisions. Queries covering more
+    cells than there are entities of the kind scan that kind's members instead,
+    so a big shockwave on an empty board stays cheap.
+
+    With a FreeCells index attached, cells covered by any entity of a
+    `blocking` kind are kept out of it as entities appear, move and die.
+    """
+
+    def __init__(self, cell_size, free_cells=None, blocking=()):
+        self.cell_size = cell_size
+        self.free_cells = free_cells
+        self.blocking = frozenset(blocking)
+        self._blockers = {} # cell -> number of blocking entities covering it
+        self.cells = {}
+        self._spans = {}
+        self._kinds = {}
+        self._by_kind = {}
+
+    def __len__(self):
+        return len(self._spans)
+
+    def __contains__(self, obj):
+        return id(obj) in self._spans
+
+    def _span(self, rect):
+        cs = self.cell_size
+        return (rect.left // cs, rect.top // cs, (rect.right - 1) // cs, (rect.bottom - 1) // cs)
+
+    def _link(self, key, obj, span):
+        cells = self.cells
+        x0, y0, x1, y1 = span
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None: bucket = cells[(cx, cy)] = {}
+                bucket[key] = obj
+        if self.free_cells is not None and self._kinds[key] in self.blocking: self._block(span, 1)
+
+    def _unlink(self, key, span):
+        cells = self.cells
+        x0, y0, x1, y1 = span
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells[(cx, cy)]
+                del bucket[key]
+                if not bucket: del cells[(cx, cy)]
+        if self.free_cells is not None and self._kinds[key] in self.blocking: self._block(span, -1)
+
+    def _block(self, span, delta):
+        blockers, free_cells = self._blockers, self.free_cells
+        x0, y0, x1, y1 = span
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                count = blockers.get((cx, cy), 0) + delta
+                if count: blockers[(cx, cy)] = count
+                else: del blockers[(cx, cy)]
+                if count == 1 and delta > 0: free_cells.occupy((cx, cy))
+                elif count == 0: free_cells.release((cx, cy))
+
+    def blocked(self, cell):
+        """True if an entity of a `blocking` kind covers `cell`."""
+        bucket = self.cells.get(cell)
+        return bool(bucket) and any(self._kinds[key] in self.blocking for key in bucket)
+
+    def insert(self, obj, rect, kind):
+        key = id(obj)
+        if key in self._spans: self.remove(obj)
+        span = self._span(rect)
+        self._spans[key] = span; self._kinds[key] = kind
+        self._by_kind.setdefault(kind, {})[key] = obj
+        self._link(key, obj, span)
+
+    def move(self, obj, rect):
+        key = id(obj)
+        old_span, span = self._spans[key], self._span(rect)
+        if span == old_span: return
+        self._unlink(key, old_span); self._link(key, obj, span)
+        self._spans[key] = span
+
+    def remove(self, obj):
+        key = id(obj)
+        span = self._spans.pop(key, None)
+        if span is None: return
+        self._unlink(key, span)
+        del self._by_kind[self._kinds.pop(key)][key]
+
+    def clear(self, kind=None):
+        for key in list(self._kinds if kind is None else self._by_kind.get(kind, ())):
+            self._unlink(key, self._spans.pop(key)); del self._by_kind[self._kinds.pop(key)][key]
+
+    def _query_span(self, span, kind):
+        cells, kinds = self.cells, self._kinds
+        x0, y0, x1, y1 = span
+        if kind is not None:
+            members = self._by_kind.get(kind)
+            if not members: return []
+            if len(members) < (x1 - x0 + 1) * (y1 - y0 + 1):
+                spans = self._spans
+                return [obj for key, obj in members.items()
+                        if spans[key][0] <= x1 and spans[key][2] >= x0 and spans[key][1] <= y1 and spans[key][3] >= y0]
+        found, seen = [], set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if not bucket: continue
+                for key, obj in bucket.items():
+                    if key in seen or (kind is not None and kinds[key] != kind): continue
+                    seen.add(key); found.append(obj)
+        return found
+
+    def query(self, rect, kind=None):
+        """Entities of `kind` sharing a cell with `rect` (candidates; callers still colliderect)."""
+        return self._query_span(self._span(rect), kind)
+
+    def query_radius(self, center, radius, kind=None):
+        """Entities of `kind` in cells touched by the circle's bounding box."""
+        cs = self.cell_size
+        cx, cy = center
+        return self._query_span((int(cx - radius) // cs, int(cy - radius) // cs,
+                                 int(cx + radius) // cs, int(cy + radius) // cs), kind)
+
+
+if __name__ == '__main__':
+    import random
+    import time
+
+    import pygame
+
+    # Collision benchmark: one tick of dart-vs-enemy checks, brute force against
+    # the grid, as the number of enemies grows. The board grows with the count so
+    # enemy density stays at one per 16 cells, like a busy wave on the 800x800 map.
+    from sim import snake_block
+
+    rng = random.Random(0)
+    num_darts, repeats, cells_per_enemy = 30, 20, 16
+    print(f"{'enemies':>8} {'brute ms':>10} {'grid ms':>10}")
+    for num_enemies in (10, 100, 1000, 5000, 20000):
+        side = int((num_enemies * cells_per_enemy) ** 0.5 + 1) * snake_block
+        def random_rect():
+            return pygame.Rect(rng.randrange(0, side - snake_block), rng.randrange(0, side - snake_block), snake_block, snake_block)
+        enemies = [random_rect() for _ in range(num_enemies)]
+        darts = [random_rect() for _ in range(num_darts)]
+        grid = SpatialHash(snake_block)
+        for e in enemies: grid.insert(e, e, 'enemy')
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            brute_hits = sum(1 for d in darts for e in enemies if d.colliderect(e))
+        brute_ms = (time.perf_counter() - start) * 1000 / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            grid_hits = sum(1 for d in darts for e in grid.query(d, 'enemy') if d.colliderect(e))
+        grid_ms = (time.perf_counter() - start) * 1000 / repeats
+
+        assert brute_hits == grid_hits
+        print(f"{num_enemies:>8} {brute_ms:>10.3f} {grid_ms:>10.3f}")
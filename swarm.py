@@ -0,0 +1,130 @@
+try:
+    import numpy as np
+except ImportError: # Swarm mode is optional; the normal game never needs NumPy
+    np = None
+
+
+def _round_like_rect(values):
+    # pygame.Rect rounds assigned floats half away from zero; np.rint would round half to even
+    return np.trunc(values + np.copysign(0.5, values))
+
+
+class EnemySwarm:
+    """Struct-of-arrays enemy storage for horde-sized waves.
+
+    Top-left positions and per-enemy speeds live in parallel NumPy arrays, so
+    chasing, hit tests and shockwave sweeps are each a handful of vector ops.
+    Killing enemies compacts the arrays with a keep-mask instead of removing
+    them one by one; dart hits are flagged with mark_dead as they land and
+    compacted together once the tick's darts have moved. Positions are
+    rounded after each step exactly like the pygame.Rect enemies in the
+    list-based mode, so small waves play the same.
+    """
+
+    def __init__(self, size):
+        if np is None: raise ImportError("swarm mode needs NumPy (pip install numpy)")
+        self.size = size
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.speed = np.empty(0)
+        self._dead, self._pending = None, 0 # Flags from mark_dead awaiting compact()
+
+    def __len__(self):
+        return len(self.x) - self._pending
+
+    def clear(self):
+        self.x, self.y, self.speed = np.empty(0), np.empty(0), np.empty(0)
+        self._dead, self._pending = None, 0
+
+    def add(self, xs, ys, speeds):
+        self.compact()
+        self.x = np.concatenate((self.x, np.asarray(xs, dtype=float)))
+        self.y = np.concatenate((self.y, np.asarray(ys, dtype=float)))
+        self.speed = np.concatenate((self.speed, np.asarray(speeds, dtype=float)))
+
+    def kill(self, dead):
+        """Drop every enemy flagged in the boolean array `dead`; returns how many died."""
+        # The mask indexes the arrays as they were when it was built; within() compacts first so they still match
+        assert not self._pending, "kill mask built while mark_dead flags were pending"
+        count = int(np.count_nonzero(dead))
+        if count:
+            keep = ~dead
+            self.x, self.y, self.speed = self.x[keep], self.y[keep], self.speed[keep]
+        return count
+
+    def chase(self, target_cx, target_cy, flow_field=None):
+        """Step every enemy toward the target; with a FlowField over enemy-sized cells, along its paths."""
+        half, size = self.size // 2, self.size
+        step_x, step_y = np.sign(target_cx - (self.x + half)), np.sign(target_cy - (self.y + half))
+        if flow_field is None or not len(self.x):
+            self.x = _round_like_rect(self.x + step_x * self.speed)
+            self.y = _round_like_rect(self.y + step_y * self.speed)
+            return
+        # Cells the field has no step for (the target's own, unreachable) keep the straight line
+        cols, rows = ((self.x + half) // size).astype(int), ((self.y + half) // size).astype(int)
+        flow_x, flow_y, found = flow_field.directions(cols, rows)
+        # As in GameSim._follow_step: line up with the lane on an axis the step doesn't use, and only
+        # advance along one while the whole body stays off blocked cells. Positions are whole pixels, so
+        # the cell arithmetic runs on integer copies; NumPy's float floor division is several times slower.
+        def body_clear(x, y):
+            return flow_field.areas_clear(x // size, y // size, (x + size - 1) // size, (y + size - 1) // size)
+        xi, yi = self.x.astype(np.int64), self.y.astype(np.int64)
+        for axis, step, flow, cells in ((0, step_x, flow_x, cols), (1, step_y, flow_y, rows)):
+            pos, pos_i = (self.x, xi) if axis == 0 else (self.y, yi)
+            centre = np.minimum(np.maximum(cells * size - pos_i, -self.speed), self.speed)
+            moved = _round_like_rect(pos + np.where(found, np.where(flow != 0, flow * self.speed, centre), step * self.speed))
+            moved_i = moved.astype(np.int64)
+            # Only a flow step whose leading edge enters the next cell can reach a blocked one
+            ahead = flow > 0
+            crossed = np.flatnonzero(found & (flow != 0) & ((moved_i - ahead) // size != (pos_i - ahead) // size))
+            if len(crossed):
+                x, y = (moved_i[crossed], yi[crossed]) if axis == 0 else (xi[crossed], moved_i[crossed])
+                back = crossed[~body_clear(x, y)]
+                if len(back):
+                    back = back[body_clear(xi[back], yi[back])] # Ones already on a blocked cell go on
+                    moved[back], moved_i[back] = pos[back], pos_i[back]
+            if axis == 0: self.x, xi = moved, moved_i
+            else: self.y = moved
+
+    def overlapping(self, rect):
+        """Boolean mask of enemies whose box overlaps `rect` (pygame.Rect.colliderect rules)."""
+        size = self.size
+        return (self.x < rect.right) & (self.x + size > rect.left) & (self.y < rect.bottom) & (self.y + size > rect.top)
+
+    def first_overlapping(self, rect):
+        """Index of the oldest enemy overlapping `rect`, or None."""
+        hits = self.overlapping(rect)
+        if self._dead is not None: hits &= ~self._dead
+        hits = np.flatnonzero(hits)
+        return int(hits[0]) if len(hits) else None
+
+    def mark_dead(self, index):
+        """Take one enemy out of play; its slot stays until compact() so a run of hits costs one copy, not one each."""
+        if self._dead is None: self._dead = np.zeros(len(self.x), dtype=bool)
+        self._dead[index] = True; self._pending += 1
+
+    def compact(self):
+        if self._dead is None: return
+        keep = ~self._dead
+        self.x, self.y, self.speed = self.x[keep], self.y[keep], self.speed[keep]
+        self._dead, self._pending = None, 0
+
+    def within(self, center, radius):
+        """Boolean mask of enemies whose centre is within `radius` plus half a body of `center`; for kill()."""
+        self.compact()
+        half = self.size // 2
+        return np.hypot(self.x + half - center[0], self.y + half - center[1]) < radius + half
+
+    def occupied_cells(self, cell_size):
+        """Set of (col, row) cells covered by at least one enemy."""
+        cols = [self.x // cell_size, (self.x + self.size - 1) // cell_size]
+        rows = [self.y // cell_size, (self.y + self.size - 1) // cell_size]
+        cells = set()
+        for c in cols:
+            for r in rows: cells.update(zip(c.astype(int).tolist(), r.astype(int).tolist()))
+        return cells
+
+    def rects(self, mask=None):
+        size = self.size
+        xs, ys = (self.x, self.y) if mask is None else (self.x[mask], self.y[mask])
+        return [(x, y, size, size) for x, y in zip(xs.astype(int).tolist(), ys.astype(int).tolist())]
@@ -0,0 +1,170 @@
+"""Batched environment API for training and evaluating agents.
+
+    env = VecEnv(64, frame_skip=5)
+    obs = env.reset(seed=0)
+    obs, rewards, terminated, truncated, info = env.step(actions)
+
+N GameSims advance in lockstep with no window, mixer or pygame events.
+`actions` is an (N, 3) integer array of (direction, fire, shockwave) with
+direction an index into ACTION_DIRECTIONS (0 = keep going), matching the
+keyboard and mouse controls. Observations are NumPy arrays:
+
+    obs['grid']     uint8   (N, len(CHANNELS), rows, cols)  1 where an entity's centre is
+    obs['scalars']  float32 (N, len(SCALARS))
+
+The grid covers the camera view in snake_block cells, which is the whole
+board in classic games. Rewards are score gained during the step. A game
+that ends is reset straight away with the next seed, so the observation
+returned for it is the new game's first; the finished game's score, length
+and cause are in `info` for the envs flagged done.
+
+    python vecenv.py            # env-steps per second with random actions
+"""
+import random
+
+import numpy as np
+
+from sim import GameSim, Inputs, NO_INPUT, WIDTH, HEIGHT, snake_block, game_speed
+
+ACTION_DIRECTIONS = (None, 'UP', 'DOWN', 'LEFT', 'RIGHT')
+CHANNELS = ('snake', 'apple', 'blue_item', 'enemy', 'bomb', 'dart', 'boss')
+SCALARS = ('score', 'shockwave_charges', 'num_darts_per_shot', 'boss_health', 'dart_ready', 'shockwave_active',
+           'snake_vx', 'snake_vy', 'time')
+DEFAULT_MAX_TICKS = 10 * 60 * game_speed # Ten minutes of play, as balance.py caps games
+
+SNAKE, APPLE, BLUE_ITEM, ENEMY, BOMB, DART, BOSS = range(len(CHANNELS))
+# Every action decodes to one of these shared tuples rather than a new Inputs per env per step
+_INPUTS = [[[Inputs(direction, bool(fire), bool(shockwave)) for shockwave in (0, 1)] for fire in (0, 1)] for direction in ACTION_DIRECTIONS]
+
+class VecEnv:
+    """N independent games stepped together.
+
+    `frame_skip` sim ticks pass per step. The action applies on the first of
+    them, like a key press, and the rest run with no input, so agents
+    can act at the snake's move cadence (every 5 ticks) instead of every tick.
+    Other keyword arguments go to each GameSim (swarm, tuning, turn_buffer,
+    flow_field, world_size, ...); enemies path around bombs as in the game
+    unless flow_field=False.
+    """
+
+    def __init__(self, num_envs, frame_skip=1, max_ticks=DEFAULT_MAX_TICKS, **sim_options):
+        self.num_envs, self.frame_skip, self.max_ticks = num_envs, frame_skip, max_ticks
+        self.sim_options = sim_options
+        self.rows, self.cols = HEIGHT // snake_block, WIDTH // snake_block
+        self.grid = np.zeros((num_envs, len(CHANNELS), self.rows, self.cols), dtype=np.uint8)
+        self.scalars = np.zeros((num_envs, len(SCALARS)), dtype=np.float32)
+        self.sims, self._next_seed = [], 0
+
+    def _new_sim(self):
+        seed, self._next_seed = self._next_seed, self._next_seed + 1
+        return GameSim(seed, **self.sim_options)
+
+    def reset(self, seed=None):
+        """Start N fresh games on seeds seed .. seed+N-1; later games take the seeds after them."""
+        self._next_seed = random.randrange(2 ** 31) if seed is None else seed
+        self.sims = [self._new_sim() for _ in range(self.num_envs)]
+        return self._observe()
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs, 3).tolist()
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        terminated = np.zeros(self.num_envs, dtype=bool)
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        finished = {} # env -> (score, ticks, cause) of games that ended this step
+        skip, max_ticks, sims = self.frame_skip, self.max_ticks, self.sims
+        for i, (direction, fire, shockwave) in enumerate(actions):
+            sim = sims[i]
+            score = sim.score
+            sim.tick(_INPUTS[direction][fire != 0][shockwave != 0])
+            for _ in range(skip - 1):
+                if not sim.is_active: break
+                sim.tick(NO_INPUT)
+            rewards[i] = sim.score - score
+            if not sim.is_active or sim.tick_count >= max_ticks:
+                terminated[i], truncated[i] = not sim.is_active, sim.is_active
+                finished[i] = (sim.score, sim.tick_count, sim.death_cause or ('victory' if sim.game_state == "VICTORY" else 'timeout'))
+                sims[i] = self._new_sim()
+        ended = [finished.get(i, (0, 0, None)) for i in range(self.num_envs)]
+        info = {'final_score': np.array([e[0] for e in ended], dtype=np.float32), 'episode_ticks': np.array([e[1] for e in ended], dtype=np.int64),
+                'cause': [e[2] for e in ended]}
+        return self._observe(), rewards, terminated, truncated, info
+
+    def _observe(self):
+        grid, cols, rows = self.grid, self.cols, self.rows
+        grid.fill(0)
+        flat = grid.reshape(-1)
+        marks, swarm_marks = [], []
+        plane = rows * cols
+        for i, sim in enumerate(self.sims):
+            view = sim.camera_rect()
+            left, top = view.x, view.y
+            base = i * len(CHANNELS) * plane
+
+            def mark(channel, rects):
+                offset = base + channel * plane
+                for r in rects:
+                    col, row = (r.centerx - left) // snake_block, (r.centery - top) // snake_block
+                    if 0 <= col < cols and 0 <= row < rows: marks.append(offset + row * cols + col)
+
+            mark(SNAKE, (sim.snake_rect,))
+            if sim.apple_rect: mark(APPLE, (sim.apple_rect,))
+            if sim.blue_item_rect: mark(BLUE_ITEM, (sim.blue_item_rect,))
+            if sim.large_world:
+                mark(ENEMY, [e['rect'] for e in sim.grid.query(view, 'enemy')] if sim.swarm is None else ())
+                mark(BOMB, sim.grid.query(view, 'bomb'))
+            else:
+                mark(ENEMY, [e['rect'] for e in sim.enemies])
+                mark(BOMB, sim.bombs)
+            mark(DART, [d.rect for d in sim.darts])
+            if sim.swarm is not None and len(sim.swarm):
+                half = snake_block // 2
+                col = ((sim.swarm.x + half - left) // snake_block).astype(np.int64)
+                row = ((sim.swarm.y + half - top) // snake_block).astype(np.int64)
+                inside = (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+                swarm_marks.append(base + ENEMY * plane + row[inside] * cols + col[inside])
+            if sim.boss_rect:
+                # The boss covers several cells; mark all of them
+                boss = sim.boss_rect.move(-left, -top)
+                grid[i, BOSS, max(0, boss.top // snake_block):max(0, (boss.bottom - 1) // snake_block + 1),
+                     max(0, boss.left // snake_block):max(0, (boss.right - 1) // snake_block + 1)] = 1
+            self.scalars[i] = (sim.score, sim.shockwave_charges, sim.num_darts_per_shot, sim.boss_health if sim.boss_rect else 0,
+                               sim.dart_ready, sim.shockwave_active, sim.snake_vx, sim.snake_vy, sim.time)
+        if marks: flat[marks] = 1
+        for cells in swarm_marks: flat[cells] = 1
+        return {'grid': grid.copy(), 'scalars': self.scalars.copy()}
+
+    def render(self, index=0):
+        """Draw one env's game in the game window and return it as an (H, W, 3) RGB array."""
+        import pygame
+        import game
+        game.init_game()
+        game.screen.fill(game.BLACK)
+        game.draw_sim(self.sims[index])
+        pygame.display.update()
+        return pygame.surfarray.array3d(game.screen).swapaxes(0, 1)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Env-step throughput with random actions")
+    parser.add_argument('--envs', type=int, default=64)
+    parser.add_argument('--steps', type=int, default=500)
+    parser.add_argument('--frame-skip', type=int, default=1)
+    args = parser.parse_args()
+
+    env = VecEnv(args.envs, frame_skip=args.frame_skip)
+    env.reset(seed=0)
+    rng = np.random.default_rng(0)
+    actions = np.stack([rng.integers(0, len(ACTION_DIRECTIONS), (args.steps, args.envs)),
+                        rng.random((args.steps, args.envs)) < 0.1, rng.random((args.steps, args.envs)) < 0.01], axis=-1)
+    episodes = 0
+    start = time.perf_counter()
+    for step in range(args.steps):
+        _, _, terminated, truncated, _ = env.step(actions[step])
+        episodes += int(terminated.sum() + truncated.sum())
+    elapsed = time.perf_counter() - start
+    env_steps = args.steps * args.envs
+    print(f"{env_steps} env-steps ({env_steps * args.frame_skip} ticks, {episodes} episodes) in {elapsed:.2f}s: "
+          f"{env_steps / elapsed:.0f} env-steps/s")